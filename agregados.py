@@ -0,0 +1,134 @@
+"""
+agregados.py — Cubo de agregados mensais compartilhado pelas abas do dashboard.
+
+Somas e contagens por MesAno × (Categoria, Subcategoria), MesAno × Estabelecimento,
+MesAno × Cartao e MesAno × Tipo_Gasto são calculadas uma única vez por versão dos
+dados. As abas respondem a partir delas com trabalho proporcional a
+meses × categorias, em vez de filtrar e agrupar todas as transações a cada rerun.
+As janelas móveis (totais mensais, por categoria e média móvel) ficam em arrays
+posicionais: qualquer mês de referência e tamanho de janela vira um slice.
+"""
+
+import numpy as np
+
+# Nível do cubo → colunas agrupadas junto com MesAno
+NIVEIS = {
+    "mes": [],
+    "categoria": ["Categoria", "Subcategoria"],
+    "estabelecimento": ["Estabelecimento"],
+    "cartao": ["Cartao"],
+    "tipo_gasto": ["Tipo_Gasto"],
+}
+
+
+def construir_cubo(df, niveis=None):
+    """
+    Agrega o dataset (com as colunas *_View) em cada nível de NIVEIS.
+
+    Cada nível vira um DataFrame indexado por (MesAno, *chaves), em ordem
+    cronológica, só com as combinações que existem nos dados:
+      Valor           soma de Valor_View
+      Valor_Positivo  soma só dos lançamentos positivos (o que pizza/sunburst exibem)
+      Itens           número de transações
+      Passivo         soma de Passivo_View
+    """
+    niveis = NIVEIS if niveis is None else {n: NIVEIS[n] for n in niveis}
+    chaves = sorted({c for cols in niveis.values() for c in cols})
+
+    base = df[["MesAno", *chaves, "Valor_View", "Passivo_View"]].assign(
+        Valor_Positivo=df["Valor_View"].where(df["Valor_View"] > 0, 0.0)
+    )
+
+    cubo = {}
+    for nivel, cols in niveis.items():
+        cubo[nivel] = base.groupby(["MesAno", *cols], observed=True).agg(
+            Valor=("Valor_View", "sum"),
+            Valor_Positivo=("Valor_Positivo", "sum"),
+            Itens=("Valor_View", "size"),
+            Passivo=("Passivo_View", "sum"),
+        )
+    if "mes" in cubo and "categoria" in cubo:
+        cubo["janelas"] = construir_janelas(cubo)
+    return cubo
+
+
+def meses(cubo):
+    """Meses presentes nos dados, em ordem cronológica."""
+    return cubo["mes"].index.tolist()
+
+
+def totais_mensais(cubo, coluna="Valor"):
+    """Série MesAno → total do mês, em ordem cronológica."""
+    return cubo["mes"][coluna]
+
+
+def recortar(cubo, nivel, meses):
+    """Linhas do nível para um mês (str) ou uma lista de meses."""
+    if isinstance(meses, str):
+        meses = [meses]
+    tabela = cubo[nivel]
+    return tabela[tabela.index.get_level_values("MesAno").isin(meses)]
+
+
+def somar(cubo, nivel, meses, chaves, coluna="Valor"):
+    """Soma `coluna` do nível nos meses dados, agrupada pelas `chaves`."""
+    fatia = recortar(cubo, nivel, meses)
+    return fatia.groupby(level=chaves, observed=True)[coluna].sum()
+
+
+# ── JANELAS MÓVEIS ────────────────────────────────────────────────────────────
+
+
+def construir_janelas(cubo, janela_movel=3):
+    """
+    Séries mensais em arrays posicionais, para KPIs de janela por consulta de índice.
+
+      meses, posicao        lista cronológica e mês → posição
+      totais                total de cada mês
+      media_movel           média móvel de `janela_movel` meses dos totais
+      categorias            categorias (colunas das matrizes abaixo)
+      valor_categoria       matriz meses × categorias com o total do mês
+      itens_categoria       idem com o número de transações (0 = não apareceu)
+    """
+    totais = totais_mensais(cubo)
+    meses_lista = totais.index.tolist()
+
+    por_cat = cubo["categoria"].groupby(level=["MesAno", "Categoria"], observed=True)[
+        ["Valor", "Itens"]
+    ].sum()
+    valor_cat = por_cat["Valor"].unstack("Categoria", fill_value=0.0)
+    itens_cat = por_cat["Itens"].unstack("Categoria", fill_value=0)
+
+    return {
+        "meses": meses_lista,
+        "posicao": {m: i for i, m in enumerate(meses_lista)},
+        "totais": totais.to_numpy(),
+        "media_movel": totais.rolling(janela_movel, min_periods=1).mean().to_numpy(),
+        "categorias": valor_cat.columns,
+        "valor_categoria": valor_cat.reindex(meses_lista, fill_value=0.0).to_numpy(),
+        "itens_categoria": itens_cat.reindex(meses_lista, fill_value=0).to_numpy(),
+    }
+
+
+def janelas(cubo):
+    """Janelas móveis do cubo (construídas junto com ele quando há mes e categoria)."""
+    if "janelas" not in cubo:
+        cubo["janelas"] = construir_janelas(cubo)
+    return cubo["janelas"]
+
+
+def janela(jan, mes_ref, n):
+    """(inicio, pos): os n meses anteriores a mes_ref são totais[inicio:pos]. None se não existe."""
+    pos = jan["posicao"].get(mes_ref)
+    if pos is None:
+        return None
+    return max(0, pos - n), pos
+
+
+def categorias_no_mes(jan, mes):
+    """(valores, itens) por categoria no mês; zeros se o mês não existe."""
+    pos = jan["posicao"].get(mes)
+    if pos is None:
+        zeros = np.zeros(len(jan["categorias"]))
+        return zeros, zeros
+    return jan["valor_categoria"][pos], jan["itens_categoria"][pos]
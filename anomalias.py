@@ -0,0 +1,192 @@
+"""
+anomalias.py — Motor vetorizado da aba de Alertas.
+
+Outliers, assinaturas com valor alterado, duplicatas e itens sem classificação
+saem de poucos groupbys e somas por bloco sobre as transações do mês e da
+janela histórica (recortadas pelo índice de partições, particao.py), sem
+iterrows nem máscaras por estabelecimento. As somas seguem o mesmo algoritmo de
+Series.sum(), então os valores arredondados são os da versão original com laços
+(conferida por paridade.py).
+"""
+
+import numpy as np
+import pandas as pd
+
+from constants import (
+    ALERTA_ASSINATURA_MAX_CV,
+    ALERTA_ASSINATURA_MIN_MESES,
+    ALERTA_ASSINATURA_VARIACAO,
+    ALERTA_OUTLIER_FATOR,
+)
+
+MESES_HISTORICO = 6
+
+
+# ── VETORIZADO ────────────────────────────────────────────────────────────────
+
+
+def _somar_por_estabelecimento(codigos, valores):
+    """
+    Soma de cada estabelecimento igual à de Series.sum() sobre as suas linhas.
+
+    Retorna (códigos em ordem crescente, somas, contagens). Cada grupo é um bloco
+    contíguo somado por np.add.reduce, a mesma soma em pares do NumPy que
+    Series.sum/mean usam, com as linhas na ordem original. Somas compensadas
+    (groupby().sum(), cubo) ou sequenciais (np.add.reduceat) podem diferir no
+    último bit e virar o arredondamento de meio centavo dos alertas.
+    """
+    ordem = np.argsort(codigos, kind="stable")
+    codigos, valores = codigos[ordem], valores[ordem]
+    if len(codigos) == 0:
+        return codigos, valores, np.zeros(0, dtype=np.int64)
+
+    inicios = np.flatnonzero(np.r_[True, codigos[1:] != codigos[:-1]])
+    contagens = np.diff(np.r_[inicios, len(codigos)])
+    # Uma ou duas linhas: a soma é uma adição só, igual em qualquer algoritmo
+    somas = valores[inicios].copy()
+    duas = contagens == 2
+    somas[duas] += valores[inicios[duas] + 1]
+    for i in np.flatnonzero(contagens > 2):
+        somas[i] = np.add.reduce(valores[inicios[i]:inicios[i] + contagens[i]])
+    return codigos[inicios], somas, contagens
+
+
+def _por_estabelecimento(linhas):
+    """Soma e nº de linhas de Valor_View por código de Estabelecimento."""
+    codigos = linhas["Estabelecimento"].cat.codes.to_numpy()
+    validos = codigos >= 0  # Estabelecimento nulo fica fora, como no groupby
+    codigos, somas, contagens = _somar_por_estabelecimento(
+        codigos[validos], linhas["Valor_View"].to_numpy()[validos]
+    )
+    return pd.DataFrame({"soma": somas, "n": contagens}, index=codigos)
+
+
+def _outliers(atuais, hist, nomes):
+    """Estabelecimento com valor atual > 2.5x a média histórica (mín. 2 ocorrências)."""
+    hist = hist[hist["n"] >= 2]
+    media = (hist["soma"] / hist["n"]).reindex(atuais.index)
+    atual = atuais["soma"]
+
+    mask = (media > 0) & (atual > media * ALERTA_OUTLIER_FATOR)
+    atual, media = atual[mask], media[mask]
+    tabela = pd.DataFrame({
+        "Estabelecimento": nomes[atual.index].astype(object),
+        "Valor Atual (R$)": atual.round(2).to_numpy(),
+        "Média Histórica (R$)": media.round(2).to_numpy(),
+        "Vezes acima": (atual / media).round(1).to_numpy(),
+    })
+    return tabela.sort_values("Vezes acima", ascending=False, kind="stable").to_dict("records")
+
+
+def _assinaturas(atuais, df_hist, nomes):
+    """Recorrente (>= 3 meses, baixa variação) cujo valor atual mudou > 10%."""
+    # Uma linha por (estabelecimento, mês) em que apareceu, em ordem de mês
+    mensal = (
+        df_hist.groupby(["Estabelecimento", "MesAno"], observed=True)["Valor_View"]
+        .sum()
+        .reset_index()
+    )
+    codigos = mensal["Estabelecimento"].cat.codes.to_numpy()
+    recorrentes = np.isin(codigos, atuais.index) & (
+        np.bincount(codigos, minlength=len(nomes))[codigos] >= ALERTA_ASSINATURA_MIN_MESES
+    )
+    codigos, valores = codigos[recorrentes], mensal["Valor_View"].to_numpy()[recorrentes]
+    estabs, somas, meses = _somar_por_estabelecimento(codigos, valores)
+
+    # Desvio padrão em duas passadas, como Series.std()
+    media_hist = somas / meses
+    desvios = _somar_por_estabelecimento(codigos, (np.repeat(media_hist, meses) - valores) ** 2)[1]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cv = np.where(media_hist > 0, np.sqrt(desvios / (meses - 1)) / media_hist, 1)
+    # alta variância histórica = não é assinatura fixa
+    fixas = ~(cv > ALERTA_ASSINATURA_MAX_CV)
+    estabs, media_hist = estabs[fixas], media_hist[fixas]
+
+    val_atual = atuais["soma"].reindex(estabs).to_numpy()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        variacao = np.where(media_hist > 0, (val_atual - media_hist) / media_hist, 0)
+    mask = np.abs(variacao) > ALERTA_ASSINATURA_VARIACAO
+
+    return pd.DataFrame({
+        "Estabelecimento": nomes[estabs[mask]].astype(object),
+        "Valor Atual (R$)": pd.Series(val_atual[mask]).round(2).to_numpy(),
+        "Valor Habitual (R$)": pd.Series(media_hist[mask]).round(2).to_numpy(),
+        "Variação (%)": pd.Series(variacao[mask] * 100).round(1).to_numpy(),
+    }).to_dict("records")
+
+
+def _duplicatas(df_mes):
+    """Fortes: mesmo (estab, valor, data). Fracas: mesmo (estab, valor) em datas distintas."""
+    chaves = [df_mes["Estabelecimento"], df_mes["Valor_View"]]
+
+    # Agrupa pelo dia (datetime) e só formata as datas dos grupos repetidos
+    grupo = (
+        df_mes.groupby(chaves + [df_mes["Data"].dt.normalize().rename("Dia")], observed=True)
+        .size()
+        .reset_index(name="n")
+    )
+    fortes = grupo[grupo["n"] > 1]
+    df_fortes = pd.DataFrame({
+        "Estabelecimento": fortes["Estabelecimento"].astype(object).to_numpy(),
+        "Valor (R$)": fortes["Valor_View"].round(2).to_numpy(),
+        "Data": fortes["Dia"].dt.strftime("%Y-%m-%d").to_numpy(),
+        "Ocorrências": fortes["n"].astype(int).to_numpy(),
+        "Nível": "⚠️ Forte",
+    })
+
+    grupo2 = df_mes.groupby(chaves, observed=True).size().reset_index(name="n")
+    fracos = grupo2[grupo2["n"] > 1]
+    valor_fraco = fracos["Valor_View"].round(2)
+    # Exclui os pares (estab, valor arredondado) já detectados como fortes
+    ja_fortes = pd.MultiIndex.from_arrays(
+        [df_fortes["Estabelecimento"], df_fortes["Valor (R$)"]]
+    )
+    novos = ~pd.MultiIndex.from_arrays(
+        [fracos["Estabelecimento"].astype(object), valor_fraco]
+    ).isin(ja_fortes)
+    df_fracos = pd.DataFrame({
+        "Estabelecimento": fracos["Estabelecimento"].astype(object).to_numpy()[novos],
+        "Valor (R$)": valor_fraco.to_numpy()[novos],
+        "Data": "datas distintas",
+        "Ocorrências": fracos["n"].astype(int).to_numpy()[novos],
+        "Nível": "ℹ️ Fraco",
+    })
+
+    return df_fortes.to_dict("records") + df_fracos.to_dict("records")
+
+
+def _sem_categoria(df_mes):
+    """Categoria e Subcategoria ambas "Diversos" = não foi identificado."""
+    sem_cat = df_mes[
+        (df_mes["Categoria"].str.strip().str.lower() == "diversos")
+        & (df_mes["Subcategoria"].str.strip().str.lower() == "diversos")
+    ][["Estabelecimento", "Valor_View", "Data"]].copy()
+    sem_cat["Data"] = sem_cat["Data"].dt.strftime("%d/%m/%Y")
+    sem_cat = sem_cat.rename(columns={"Valor_View": "Valor (R$)"})
+    return sem_cat.sort_values("Valor (R$)", ascending=False).to_dict("records")
+
+
+def janela_historica(meses_ordenados, mes_ref):
+    """Até MESES_HISTORICO meses anteriores a mes_ref; None se o mês não existe."""
+    if mes_ref not in meses_ordenados:
+        return None
+    idx_atual = meses_ordenados.index(mes_ref)
+    return meses_ordenados[max(0, idx_atual - MESES_HISTORICO):idx_atual]
+
+
+def detectar(df_mes, df_hist, meses_hist):
+    """
+    Retorna dict com listas de anomalias por tipo.
+
+    df_mes são as transações do mês e df_hist as dos meses_hist
+    (janela_historica), recortadas do mesmo DataFrame.
+    """
+    nomes = df_mes["Estabelecimento"].cat.categories
+    atuais = _por_estabelecimento(df_mes)
+
+    return {
+        "outliers": _outliers(atuais, _por_estabelecimento(df_hist), nomes),
+        "assinaturas": _assinaturas(atuais, df_hist, nomes) if len(meses_hist) >= 3 else [],
+        "duplicatas": _duplicatas(df_mes),
+        "sem_categoria": _sem_categoria(df_mes),
+    }
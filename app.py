@@ -1,37 +1,98 @@
+import pandas as pd
 import streamlit as st
+import threading
+import uuid
+
+import ingestao
+import medicao
+import particao
 import utils
-from constants import LARGURA_GRAFICO
+from constants import LARGURA_GRAFICO, MEDICAO_LOG
 
 from views import tab_mes, tab_comparador, tab_futuro, tab_alertas
 
 st.set_page_config(page_title="Dashboard Financeiro", layout="wide")
 
-df = utils.carregar_dados(_cache_key=utils._cache_key_csvs())
+# Copy-on-write: Valor_View/Passivo_View compartilham memória com as colunas de origem
+pd.set_option("mode.copy_on_write", True)
+
+# Medição por etapa (medicao.py): o toggle do painel vale já para o carregamento.
+# O pedido é desta sessão; a medição segue ligada enquanto alguma sessão pedir.
+sessao = st.session_state.setdefault("sessao_medicao", uuid.uuid4().hex)
+medicao.ativar(st.session_state.get("medicao", medicao.ativo(sessao)), sessao=sessao)
+inicio_rerun = medicao.marcador()
+
+# Inteiro mantido por um observer de data/raw/: o rerun não lista nem lê os CSVs
+cache_key = utils.versao_dados()
+df = utils.carregar_dados(cache_key=cache_key)
 
 if df is None:
     st.error("Nenhum arquivo encontrado em data/raw/")
     st.stop()
 
+# Agregados por mês × categoria/estabelecimento/cartão/tipo, compartilhados pelas abas
+cubo = utils.carregar_cubo(cache_key=cache_key)
+# Mês → bloco contíguo de linhas; recortar um mês é um slice, não uma máscara
+indice = utils.carregar_indice(cache_key=cache_key)
+# Anomalias/projeção/comparativo de todos os meses calculados em segundo plano
+utils.aquecer_em_segundo_plano(cache_key=cache_key)
+
 # --- SIDEBAR ---
 st.sidebar.header("Configurações")
 
-meses = sorted(df["MesAno"].unique(), reverse=True)
+meses = sorted(indice, reverse=True)
 mes_ref_global = st.sidebar.selectbox("📅 Mês de Referência", meses)
 
+memoria = ingestao.relatorio_memoria(df)
+st.sidebar.caption(
+    f"💾 {memoria['linhas']:,} transações · {memoria['bytes'] / 1024 ** 2:.1f} MB "
+    f"({memoria['bytes_por_linha']:.0f} bytes/linha)"
+)
+st.sidebar.toggle("⏱️ Painel de desempenho", value=medicao.ativo(sessao), key="medicao")
+
 # --- ÁREA PRINCIPAL ---
 st.title("📊 Gestão Financeira Analítica")
 
-aba1, aba2, aba3, aba4 = st.tabs(["📅 Visão Mensal", "⚖️ Comparador", "🔮 Futuro & Dívida", "⚠️ Alertas"])
+# Só a aba escolhida é calculada; interações dentro dela (st.fragment)
+# reexecutam apenas a própria aba.
+ABAS = ["📅 Visão Mensal", "⚖️ Comparador", "🔮 Futuro & Dívida", "⚠️ Alertas"]
+aba = st.radio("Aba", ABAS, horizontal=True, key="aba", label_visibility="collapsed")
+
+if aba == ABAS[0]:
+    tab_mes.renderizar(df, cubo, indice, mes_ref_global, LARGURA_GRAFICO)
 
-with aba1:
-    tab_mes.renderizar(df, mes_ref_global, LARGURA_GRAFICO)
+elif aba == ABAS[1]:
+    tab_comparador.renderizar(df, cubo, cache_key, meses, LARGURA_GRAFICO)
 
-with aba2:
-    tab_comparador.renderizar(df, meses, LARGURA_GRAFICO)
+elif aba == ABAS[2]:
+    df_mes_atual = particao.fatiar(df, indice, mes_ref_global)
+    tab_futuro.renderizar(df_mes_atual, cache_key, mes_ref_global, LARGURA_GRAFICO)
 
-with aba3:
-    df_mes_atual = df[df["MesAno"] == mes_ref_global]
-    tab_futuro.renderizar(df_mes_atual, LARGURA_GRAFICO)
+else:
+    tab_alertas.renderizar(df, cubo, indice, cache_key, mes_ref_global, LARGURA_GRAFICO)
 
-with aba4:
-    tab_alertas.renderizar(df, mes_ref_global, LARGURA_GRAFICO)
+# --- PAINEL DE DESEMPENHO ---
+# Etapas deste rerun (interações dentro de uma aba só atualizam no próximo rerun completo)
+if medicao.ativo(sessao):
+    etapas = medicao.registros(inicio_rerun, thread_id=threading.get_ident())
+    with st.sidebar.expander("⏱️ Desempenho deste rerun", expanded=True):
+        if etapas:
+            df_etapas = pd.DataFrame(etapas)
+            st.dataframe(
+                pd.DataFrame({
+                    "Etapa": df_etapas["etapa"],
+                    "ms": df_etapas["segundos"] * 1000,
+                    "Próprios (ms)": df_etapas["proprios"] * 1000,
+                    "Δ MB": df_etapas["memoria_mb"],
+                    "Linhas": df_etapas["linhas"],
+                }),
+                column_config={
+                    "ms": st.column_config.NumberColumn(format="%.1f"),
+                    "Próprios (ms)": st.column_config.NumberColumn(format="%.1f"),
+                },
+                hide_index=True,
+                width="stretch",
+            )
+        else:
+            st.caption("Nada recalculado: tudo veio do cache.")
+        st.caption(f"Histórico completo em {MEDICAO_LOG}")
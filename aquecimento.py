@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+aquecimento.py — Pré-calcula os resultados de todos os meses logo após a ingestão.
+
+Para cada MesAno (do mais recente para o mais antigo) calcula anomalias,
+projeção de parcelas e o comparativo com o mês anterior, deixando tudo no
+cache de resultados.py. Os agregados já saem prontos do cubo (agregados.py).
+
+No dashboard, utils.aquecer_em_segundo_plano dispara uma thread por versão dos
+dados assim que o servidor carrega o armazém; o cache de resultados.py é
+dimensionado para caber o histórico inteiro.
+
+O cache é memória do processo, então a linha de comando não aquece o servidor:
+ela sincroniza o armazém e grava o instantâneo do dataset e do cubo
+(instantaneo.py), o que o próximo start do servidor aproveita, e mede quanto o
+aquecimento do servidor vai custar.
+
+Uso:
+    python aquecimento.py
+    python aquecimento.py --meses 12   # só os 12 meses mais recentes
+"""
+
+import argparse
+import time
+
+import ingestao
+import nucleo
+import particao
+import resultados
+
+# Resultados guardados por mês (anomalias, projeção, comparativo)
+CALCULOS_POR_MES = 3
+
+
+def aquecer(df, cubo, indice, versao, meses=None, parar=None):
+    """
+    Preenche o cache de resultados para os meses dados (todos, por padrão).
+
+    Antes reserva no cache lugar para todos os meses desta versão, então nenhum
+    mês aquecido é expulso pelo seguinte nem pelo uso normal das sessões.
+    Começa pelo mês mais recente; `parar` (threading.Event) interrompe entre um
+    mês e outro. Retorna o número de meses aquecidos.
+    """
+    cronologicos = sorted(indice)
+    anterior = dict(zip(cronologicos[1:], cronologicos[:-1]))
+    if meses is None:
+        meses = cronologicos[::-1]
+    resultados.dimensionar(versao, len(cronologicos) * CALCULOS_POR_MES)
+
+    for n, mes in enumerate(meses):
+        if parar is not None and parar.is_set():
+            return n
+        nucleo.anomalias_do_mes(df, cubo, indice, versao, mes)
+        nucleo.projecao_do_mes(particao.fatiar(df, indice, mes), versao, mes)
+        if mes in anterior:
+            nucleo.delta_dos_meses(df, cubo, versao, mes, anterior[mes])
+    return len(meses)
+
+
+# ── MAIN ──────────────────────────────────────────────────────────────────────
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pré-calcula os resultados de todos os meses.")
+    parser.add_argument("--meses", type=int, default=None, help="Só os N meses mais recentes")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    df, avisos = nucleo.carregar_dados()
+    for nome, msg in avisos:
+        print(f"⚠  {nome}: {msg}")
+    if df is None:
+        print("❌ Nenhum CSV em data/raw/.")
+        raise SystemExit(1)
+    cubo = nucleo.carregar_cubo(df)
+    indice = particao.indexar_meses(df)
+    t1 = time.perf_counter()
+
+    meses = sorted(indice, reverse=True)
+    if args.meses is not None:
+        meses = meses[: args.meses]
+    aquecidos = aquecer(df, cubo, indice, ingestao.versao_armazem(), meses)
+    t2 = time.perf_counter()
+
+    stats = resultados.estatisticas()
+    print(f"📦 Armazém + instantâneo + cubo + índice: {t1 - t0:.2f}s ({len(df):,} transações)")
+    print(
+        f"🔥 {aquecidos} meses aquecidos em {t2 - t1:.2f}s "
+        f"({stats['entradas']}/{stats['capacidade']} resultados, "
+        f"{(t2 - t1) / max(aquecidos, 1) * 1000:.0f} ms/mês)"
+    )
+    print("ℹ️  Cache em memória deste processo: o servidor aquece o dele ao subir.")
+
+
+if __name__ == "__main__":
+    main()
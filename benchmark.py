@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+"""
+benchmark.py — Faturas sintéticas e medição dos caminhos quentes do dashboard.
+
+Gera históricos de 1, 5 e 20 anos no formato dos CSVs de parse_pdf.py (cartões
+de CARD_MAP, milhares de estabelecimentos, compras parceladas que avançam mês a
+mês, estornos e alguns arquivos deslocados) em um diretório temporário e mede,
+sem Streamlit (nucleo.py), as funções que o dashboard chama a cada interação,
+além do tempo de importar o núcleo e o adaptador utils.py.
+O resultado vai para um JSON em data/benchmarks/ (fora do git), para comparar
+rodadas ao longo do tempo.
+
+Uso:
+    python benchmark.py                          # 1, 5 e 20 anos
+    python benchmark.py --anos 1 5 --transacoes 200 --repeticoes 3
+    python benchmark.py --comparar data/benchmarks/20260101-120000.json
+    python benchmark.py --classificador          # 10k regras × 100k estabelecimentos
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import agregados
+import nucleo
+import parse_pdf
+import particao
+
+DIR_RESULTADOS = Path(__file__).parent / "data" / "benchmarks"
+
+SUBCATEGORIAS = {
+    "Alimentação": ["Mercado", "Restaurante", "Padaria", "Delivery"],
+    "Saúde": ["Farmácia", "Consulta", "Plano"],
+    "Educação": ["Escola", "Cursos", "Livros"],
+    "Transporte": ["Combustível", "Uber", "Estacionamento"],
+    "Impostos e Taxas": ["IOF", "Anuidade"],
+    "Lazer": ["Cinema", "Streaming", "Viagem"],
+    "Compras": ["Roupas", "Eletrônicos", "Casa"],
+    "Diversos": ["Diversos"],
+}
+
+PROPORCAO_PARCELADAS = 0.08   # compras novas parceladas por mês
+PROPORCAO_ESTORNOS = 0.015
+PROPORCAO_DESLOCADOS = 0.05   # arquivos com o shift de colunas (validacao.py)
+
+
+def _cartoes():
+    """Nomes de cartão de parse_pdf.CARD_MAP."""
+    return sorted(set(parse_pdf.CARD_MAP.values()))
+
+
+# ── GERADOR ───────────────────────────────────────────────────────────────────
+
+
+def _formatar_br(valores):
+    return np.char.replace(np.char.mod("%.2f", valores), ".", ",")
+
+
+def gerar_faturas(dir_raw, anos, transacoes_mes=300, semente=42):
+    """
+    Grava um CSV por mês em dir_raw (AAAAMM.csv). Retorna o número de arquivos.
+
+    Compras parceladas geram uma linha por mês até a última parcela, com o mesmo
+    estabelecimento, cartão e valor; estornos são lançamentos negativos.
+    """
+    rng = np.random.default_rng(semente)
+    dir_raw = Path(dir_raw)
+    dir_raw.mkdir(parents=True, exist_ok=True)
+
+    cartoes = np.array(_cartoes())
+    lojas = np.array([f"Loja {i:04d}" for i in range(max(2000, transacoes_mes * 10))])
+    pesos = 1.0 / np.arange(1, len(lojas) + 1) ** 0.9
+    pesos /= pesos.sum()
+    pares = [(c, s) for c in SUBCATEGORIAS for s in SUBCATEGORIAS[c]]
+    # Cada estabelecimento tem sempre a mesma categoria, como no regras.csv
+    par_da_loja = rng.integers(0, len(pares), len(lojas))
+    categorias = np.array([c for c, _ in pares])[par_da_loja]
+    subcategorias = np.array([s for _, s in pares])[par_da_loja]
+
+    # Parcelamentos em andamento: loja, cartão, valor da parcela, parcela atual, total
+    ativos = {k: np.empty(0, dtype=t) for k, t in [
+        ("loja", np.int64), ("cartao", np.int64), ("valor", float),
+        ("atual", np.int64), ("total", np.int64),
+    ]}
+
+    meses = pd.period_range("2010-01", periods=anos * 12, freq="M")
+    for mes in meses:
+        n = int(rng.poisson(transacoes_mes))
+        loja = rng.choice(len(lojas), n, p=pesos)
+        cartao = rng.integers(0, len(cartoes), n)
+        valor = np.round(rng.lognormal(4.2, 1.0, n), 2)
+        atual = np.ones(n, dtype=np.int64)
+        total = np.ones(n, dtype=np.int64)
+
+        novas = rng.random(n) < PROPORCAO_PARCELADAS
+        total[novas] = rng.choice([2, 3, 4, 5, 6, 10, 12, 18, 24], novas.sum())
+        valor[novas] = np.round(valor[novas] * 3 / total[novas] + 20, 2)
+
+        estorno = ~novas & (rng.random(n) < PROPORCAO_ESTORNOS)
+        valor[estorno] *= -1
+
+        # Parcelas de compras de meses anteriores
+        seguem = ativos["atual"] < ativos["total"]
+        for chave in ativos:
+            ativos[chave] = ativos[chave][seguem]
+        ativos["atual"] = ativos["atual"] + 1
+
+        loja = np.r_[loja, ativos["loja"]]
+        cartao = np.r_[cartao, ativos["cartao"]]
+        valor = np.r_[valor, ativos["valor"]]
+        atual = np.r_[atual, ativos["atual"]]
+        total = np.r_[total, ativos["total"]]
+        estorno = np.r_[estorno, np.zeros(len(ativos["loja"]), dtype=bool)]
+
+        for chave, novos in [("loja", loja[:n][novas]), ("cartao", cartao[:n][novas]),
+                             ("valor", valor[:n][novas]), ("atual", atual[:n][novas]),
+                             ("total", total[:n][novas])]:
+            ativos[chave] = np.r_[ativos[chave], novos]
+
+        linhas = len(loja)
+        dia = rng.integers(1, 29, linhas)
+        absoluto = np.abs(valor)
+        fatura = pd.DataFrame({
+            "TxID": [f"{mes}-{i:06d}" for i in range(linhas)],
+            "Data": (mes.start_time + pd.to_timedelta(dia - 1, unit="D")).strftime("%Y-%m-%d"),
+            "MesAno": str(mes),
+            "Estabelecimento": lojas[loja],
+            "Categoria": categorias[loja],
+            "Subcategoria": subcategorias[loja],
+            "Valor_R$": _formatar_br(valor),
+            "Cartao": cartoes[cartao],
+            "Observacao": "",
+            "EhParcela": (total > 1).astype(int),
+            "ParcelaAtual": atual,
+            "TotalParcelas": total,
+            "ValorTotal": _formatar_br(absoluto * total),
+            "GrupoParcela": lojas[loja],
+            "EhEstorno": estorno.astype(int),
+            "TipodeEstorno": np.where(estorno, "Geral", ""),
+            "ValorAbsoluto": _formatar_br(absoluto),
+        })
+
+        # Mesma ordem do parser; coluna nova no esquema sem valor aqui é KeyError
+        fatura = fatura[parse_pdf.COLUNAS_CSV]
+
+        caminho = dir_raw / f"{mes.year}{mes.month:02d}.csv"
+        if rng.random() < PROPORCAO_DESLOCADOS:
+            # Cabeçalho completo, mas as linhas sem a coluna MesAno (shift à esquerda)
+            with open(caminho, "w", newline="", encoding="utf-8") as f:
+                f.write(",".join(parse_pdf.COLUNAS_CSV) + "\n")
+                fatura.drop(columns="MesAno").to_csv(f, header=False, index=False)
+        else:
+            fatura.to_csv(caminho, index=False, encoding="utf-8")
+    return len(meses)
+
+
+# ── MEDIÇÃO ───────────────────────────────────────────────────────────────────
+
+
+def _medir(funcao, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - t0)
+    return {"min": min(tempos), "mediana": statistics.median(tempos), "repeticoes": repeticoes}
+
+
+def medir_cenario(anos, transacoes_mes, repeticoes, semente=42):
+    """Gera o histórico num diretório temporário e mede cada caminho quente."""
+    diretorio = Path(tempfile.mkdtemp(prefix="bench_fatura_"))
+    cwd = os.getcwd()
+    try:
+        csvs = gerar_faturas(diretorio / "data" / "raw", anos, transacoes_mes, semente)
+        os.chdir(diretorio)
+
+        def carregar():
+            return nucleo.carregar_dados()[0]
+
+        tempos = {"carregar_dados_frio": _medir(carregar, 1)}  # valida, repara, grava Parquet e instantâneo
+        tempos["carregar_dados"] = _medir(carregar, repeticoes)
+        df = carregar()
+
+        tempos["carregar_cubo"] = _medir(lambda: nucleo.carregar_cubo(df), repeticoes)  # instantâneo
+        tempos["construir_cubo"] = _medir(lambda: agregados.construir_cubo(df), repeticoes)
+        tempos["indexar_meses"] = _medir(lambda: particao.indexar_meses(df), repeticoes)
+        cubo = agregados.construir_cubo(df)
+        indice = particao.indexar_meses(df)
+
+        meses = sorted(indice)
+        mes, anterior = meses[-1], meses[-2] if len(meses) > 1 else meses[-1]
+        df_mes = particao.fatiar(df, indice, mes)
+
+        tempos["detectar_anomalias"] = _medir(
+            lambda: nucleo.detectar_anomalias(df, mes, cubo=cubo, indice=indice), repeticoes
+        )
+        tempos["processar_dados_futuros"] = _medir(
+            lambda: nucleo.processar_dados_futuros(df_mes), repeticoes
+        )
+        tempos["calcular_metricas_contexto"] = _medir(
+            lambda: nucleo.calcular_metricas_contexto(df, mes, cubo=cubo), repeticoes
+        )
+        tempos["calcular_delta_meses"] = _medir(
+            lambda: nucleo.calcular_delta_meses(df, mes, anterior, cubo=cubo), repeticoes
+        )
+        return {
+            "anos": anos,
+            "transacoes_mes": transacoes_mes,
+            "csvs": csvs,
+            "linhas": len(df),
+            "tempos": tempos,
+        }
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+
+# ── CLASSIFICADOR (parse_pdf.py) ──────────────────────────────────────────────
+
+
+def _vocabulario(rng, n, silabas_min=2, silabas_max=5):
+    silabas = np.array([c + v for c in "bcdfglmnprstvz" for v in "aeiou"] + ["cha", "lhe", "nho", "que"])
+    tamanhos = rng.integers(silabas_min, silabas_max + 1, n)
+    sorteadas = rng.integers(0, len(silabas), (n, silabas_max))
+    return ["".join(silabas[linha[:t]]) for linha, t in zip(sorteadas, tamanhos)]
+
+
+def gerar_regras_e_nomes(n_regras, n_nomes, semente=42):
+    """
+    Regras no formato do regras.csv e nomes de estabelecimento como aparecem na
+    fatura: ~40% contêm uma palavra-chave (nível 1), ~30% têm um pedaço de uma
+    palavra-chave (nível 2) e o resto usa um vocabulário à parte (nível 3).
+    """
+    rng = np.random.default_rng(semente)
+    tokens = np.array(_vocabulario(rng, max(2000, n_regras)))
+    pares = [(c, sub) for c in SUBCATEGORIAS for sub in SUBCATEGORIAS[c]]
+    regras = []
+    for _ in range(n_regras):
+        chave = " ".join(rng.choice(tokens, rng.integers(1, 4)))
+        categoria, subcategoria = pares[rng.integers(len(pares))]
+        regras.append({"palavra_chave": chave, "categoria": categoria, "subcategoria": subcategoria})
+
+    outros = np.array(_vocabulario(rng, 5000, 3, 6))
+    prefixos = ["", "", "PAG*", "IFD*", "MP*", "EC *", "PG *"]
+    sufixos = ["", "", " SAO PAULO BR", " RIO DE JANEIRO", "-SP", " LTDA", ".COM"]
+    nomes = []
+    for _ in range(n_nomes):
+        sorte = rng.random()
+        if sorte < 0.4:
+            miolo = regras[rng.integers(n_regras)]["palavra_chave"]
+        elif sorte < 0.7:
+            palavra = max(regras[rng.integers(n_regras)]["palavra_chave"].split(), key=len)
+            tamanho = min(len(palavra), int(rng.integers(5, 9)))
+            inicio = int(rng.integers(0, len(palavra) - tamanho + 1))
+            miolo = palavra[inicio:inicio + tamanho]
+        else:
+            miolo = " ".join(rng.choice(outros, rng.integers(1, 3)))
+        nome = f"{rng.choice(prefixos)}{miolo}{rng.choice(sufixos)}"
+        nomes.append(nome.upper() if rng.random() < 0.8 else nome.title())
+    # Prioridade do carregar_regras: mais longa primeiro
+    regras.sort(key=lambda r: len(r["palavra_chave"]), reverse=True)
+    return regras, nomes
+
+
+def medir_classificador(n_regras, n_nomes, amostra_linear=2000, semente=42):
+    """Compilado × varredura linear; a linear roda numa amostra e é extrapolada."""
+    import paridade  # referência linear; paridade.py importa este módulo
+
+    regras, nomes = gerar_regras_e_nomes(n_regras, n_nomes, semente)
+
+    t0 = time.perf_counter()
+    compiladas = parse_pdf.compilar_regras(regras)
+    t1 = time.perf_counter()
+    obtidos = [parse_pdf.classificar(nome, compiladas) for nome in nomes]
+    t2 = time.perf_counter()
+    amostra = nomes[:amostra_linear]
+    esperados = [paridade._classificar_linear(nome, regras) for nome in amostra]
+    t3 = time.perf_counter()
+
+    divergencias = sum(a != b for a, b in zip(esperados, obtidos))
+    niveis = {n: sum(1 for r in obtidos if r[3] == n) for n in (1, 2, 3)}
+    por_nome_linear = (t3 - t2) / max(len(amostra), 1)
+    return {
+        "regras": n_regras,
+        "estabelecimentos": n_nomes,
+        "compilar_s": t1 - t0,
+        "classificar_s": t2 - t1,
+        "linear_amostra": len(amostra),
+        "linear_estimado_s": por_nome_linear * n_nomes,
+        "divergencias": divergencias,
+        "niveis": niveis,
+    }
+
+
+def medir_importacao(modulos=("nucleo", "utils"), repeticoes=3):
+    """Tempo de um interpretador novo importando cada módulo (inclui subir o Python)."""
+    tempos = {}
+    for modulo in modulos:
+        comando = [sys.executable, "-c", f"import {modulo}"]
+        tempos[modulo] = _medir(
+            lambda: subprocess.run(comando, cwd=Path(__file__).parent, check=True, capture_output=True),
+            repeticoes,
+        )
+    return tempos
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=Path(__file__).parent,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _imprimir_razoes(tempos, base, recuo):
+    for nome, t in tempos.items():
+        if nome in base:
+            razao = t["mediana"] / max(base[nome]["mediana"], 1e-9)
+            sinal = "🔺" if razao > 1.10 else ("🔻" if razao < 0.90 else "  ")
+            print(f"{recuo}{sinal} {nome:<28} {razao:>6.2f}x")
+
+
+def _comparar(atual, caminho_anterior):
+    anterior = json.loads(Path(caminho_anterior).read_text())
+    por_anos = {c["anos"]: c for c in anterior["cenarios"]}
+    print(f"\n📊 Comparado com {caminho_anterior} (commit {anterior.get('commit')}):")
+    if "classificador" in anterior and "classificador" in atual:
+        razao = atual["classificador"]["classificar_s"] / max(anterior["classificador"]["classificar_s"], 1e-9)
+        print(f"   classificador: {razao:.2f}x")
+    if "importacao" in anterior and "importacao" in atual:
+        print("   importação:")
+        _imprimir_razoes(atual["importacao"], anterior["importacao"], "     ")
+    for cenario in atual["cenarios"]:
+        base = por_anos.get(cenario["anos"])
+        if base is None:
+            continue
+        print(f"   {cenario['anos']} ano(s):")
+        _imprimir_razoes(cenario["tempos"], base["tempos"], "     ")
+
+
+# ── MAIN ──────────────────────────────────────────────────────────────────────
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos caminhos quentes do dashboard.")
+    parser.add_argument("--anos", type=int, nargs="+", default=[1, 5, 20], help="Históricos a gerar")
+    parser.add_argument("--transacoes", type=int, default=300, help="Transações novas por mês")
+    parser.add_argument("--repeticoes", type=int, default=5, help="Medições por função")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--saida", type=Path, default=DIR_RESULTADOS, help="Diretório dos JSONs")
+    parser.add_argument("--comparar", type=Path, help="JSON de uma rodada anterior")
+    parser.add_argument(
+        "--classificador", action="store_true",
+        help="Só o classificador do parse_pdf.py (regras × estabelecimentos)",
+    )
+    parser.add_argument("--regras", type=int, default=10_000)
+    parser.add_argument("--estabelecimentos", type=int, default=100_000)
+    parser.add_argument("--amostra-linear", type=int, default=2000, help="Nomes na varredura linear")
+    args = parser.parse_args()
+
+    resultado = {
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "maquina": f"{platform.system()} {platform.machine()}",
+        "cenarios": [],
+    }
+
+    if args.classificador:
+        print(f"🏷  Classificador: {args.regras:,} regras × {args.estabelecimentos:,} estabelecimentos...")
+        c = medir_classificador(args.regras, args.estabelecimentos, args.amostra_linear, args.semente)
+        resultado["classificador"] = c
+        print(f"   compilar regras              {c['compilar_s'] * 1000:>9.1f} ms")
+        print(f"   classificar (compilado)      {c['classificar_s'] * 1000:>9.1f} ms")
+        print(
+            f"   classificar (linear, estim.) {c['linear_estimado_s'] * 1000:>9.1f} ms "
+            f"({c['linear_estimado_s'] / max(c['classificar_s'], 1e-9):.0f}x)"
+        )
+        print(f"   níveis 1/2/3: {c['niveis'][1]:,} / {c['niveis'][2]:,} / {c['niveis'][3]:,}")
+        print(
+            f"   {'✓' if not c['divergencias'] else '✗'} {c['divergencias']} divergência(s) "
+            f"em {c['linear_amostra']:,} nomes comparados com a varredura linear"
+        )
+        args.anos = []
+    else:
+        resultado["importacao"] = medir_importacao()
+        for modulo, t in resultado["importacao"].items():
+            print(f"📥 import {modulo:<23} {t['mediana'] * 1000:>9.1f} ms")
+
+    for anos in args.anos:
+        print(f"⏱  {anos} ano(s) × ~{args.transacoes} transações/mês...")
+        cenario = medir_cenario(anos, args.transacoes, args.repeticoes, args.semente)
+        resultado["cenarios"].append(cenario)
+        print(f"   {cenario['csvs']} CSVs, {cenario['linhas']:,} linhas")
+        for nome, t in cenario["tempos"].items():
+            print(f"   {nome:<28} {t['mediana'] * 1000:>9.1f} ms (mín {t['min'] * 1000:.1f})")
+
+    args.saida.mkdir(parents=True, exist_ok=True)
+    destino = args.saida / f"{datetime.now():%Y%m%d-%H%M%S}.json"
+    destino.write_text(json.dumps(resultado, indent=2, ensure_ascii=False))
+    print(f"\n💾 Resultados em {destino}")
+
+    if args.comparar:
+        _comparar(resultado, args.comparar)
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,21 @@ ALERTA_ASSINATURA_MIN_MESES = 3    # mínimo de meses para considerar uma cobran
 ALERTA_ASSINATURA_MAX_CV = 0.15    # coeficiente de variação máximo para considerar valor fixo
 ALERTA_ASSINATURA_VARIACAO = 0.10  # variação mínima (%) para alertar mudança de assinatura
 
+# Ingestão dos CSVs (ingestao.py)
+INGESTAO_MIN_ARQUIVOS_PARALELO = 24  # abaixo disso o custo de subir processos não compensa
+INGESTAO_MAX_PROCESSOS = None        # None = todos os núcleos (4 no Raspberry Pi)
+
+# Cache de resultados derivados (resultados.py)
+RESULTADOS_MAX_ENTRADAS = 256  # anomalias/projeção/comparação por (versão, mês); LRU acima disso
+
+# Vigia de data/raw/ (vigia.py)
+VIGIA_ESPERA_SEGUNDOS = 2.0  # silêncio após o último evento antes de publicar nova versão (scp em curso)
+
+# Medição por etapa (medicao.py)
+MEDICAO_LOG = "data/medicoes.jsonl"  # uma linha JSON por etapa medida
+MEDICAO_MAX_REGISTROS = 2000         # buffer em memória do painel de desempenho
+MEDICAO_SESSAO_EXPIRA = 1800         # s sem rerun até o pedido de medição de uma sessão cair
+
 # Categorias para classificação (baseado nas categorias reais dos dados)
 CATS_ESSENCIAIS = [
     "Alimentação",
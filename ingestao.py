@@ -0,0 +1,530 @@
+#!/usr/bin/env python3
+"""
+ingestao.py — Converte os CSVs mensais de data/raw/ em um armazém colunar (Parquet).
+
+Cada CSV é validado (validacao.py), lido e limpo uma única vez; o resultado tipado vai
+para data/processed/<arquivo>.parquet e o conjunto completo para
+data/processed/consolidado.parquet, que é o que o dashboard lê. Um CSV só volta
+a ser processado quando muda (mtime/tamanho registrados no manifesto).
+
+Uso:
+    python ingestao.py             # sincroniza data/processed/ com data/raw/
+    python ingestao.py --rebuild   # reconstrói o armazém do zero
+    python ingestao.py --rebuild --processos 1   # idem, sem paralelismo
+"""
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import limpeza
+import medicao
+import particao
+import validacao
+from constants import INGESTAO_MAX_PROCESSOS, INGESTAO_MIN_ARQUIVOS_PARALELO
+
+# ── CONFIGURAÇÃO ──────────────────────────────────────────────────────────────
+
+DIR_RAW = Path("data") / "raw"
+DIR_PROCESSADO = Path("data") / "processed"
+ARQUIVO_CONSOLIDADO = "consolidado.parquet"
+ARQUIVO_MANIFESTO = "manifesto.json"
+VERSAO_ESQUEMA = 3  # incrementar quando ESQUEMA ou a ordem das linhas mudar; força reprocessar
+
+# Tipos declarados do DataFrame do dashboard. Colunas fora do esquema viram texto.
+#   "mes"       → categoria ordenada YYYY-MM (os códigos são o ordinal do mês)
+#   "categoria" → texto de baixa cardinalidade (dicionário no Parquet)
+#   "valor"     → dinheiro em texto BR/internacional convertido para float64
+ESQUEMA = {
+    "TxID": "string[pyarrow]",
+    "Data": "datetime64[ns]",
+    "MesAno": "mes",
+    "Estabelecimento": "categoria",
+    "Categoria": "categoria",
+    "Subcategoria": "categoria",
+    "Valor_R$": "float64",
+    "Cartao": "categoria",
+    "Observacao": "categoria",
+    "EhParcela": "int8",
+    "ParcelaAtual": "int16",
+    "TotalParcelas": "int8",
+    "ValorTotal": "valor",
+    "GrupoParcela": "categoria",
+    "EhEstorno": "int8",
+    "TipodeEstorno": "categoria",
+    "ValorAbsoluto": "valor",
+    "Passivo_Futuro": "float64",
+    "Tipo_Gasto": "categoria",
+}
+
+# Apelidos usados pelas views; não são gravados, apontam para a coluna de origem
+COLUNAS_VIEW = {"Valor_View": "Valor_R$", "Passivo_View": "Passivo_Futuro"}
+
+
+# ── LIMPEZA ───────────────────────────────────────────────────────────────────
+
+
+def ler_csv(caminho):
+    """Lê um CSV mensal já validado (ver validacao.py), sem lógica de reparo."""
+    df_temp = pd.read_csv(caminho, encoding="utf-8", engine="python")
+    df_temp.columns = [c.strip() for c in df_temp.columns]
+    return df_temp
+
+
+def limpar_dados(df):
+    """Normaliza datas, textos, valores e parcelas e calcula os campos derivados."""
+    # --- 1. LIMPEZA DE DADOS ---
+    df["Data"] = pd.to_datetime(df["Data"], errors="coerce")
+    df = df.dropna(subset=["Data"])
+
+    # MesAno
+    if "MesAno" in df.columns:
+        df["MesAno"] = df["MesAno"].astype(str).str.strip()
+        mask_invalido = ~df["MesAno"].str.match(r"^\d{4}-\d{2}$")
+        mask_nulo = (
+            (df["MesAno"] == "") | (df["MesAno"].str.lower() == "nan") | mask_invalido
+        )
+        df.loc[mask_nulo, "MesAno"] = df.loc[mask_nulo, "Data"].dt.strftime("%Y-%m")
+    else:
+        df["MesAno"] = df["Data"].dt.strftime("%Y-%m")
+
+    # Textos
+    for col in ["Estabelecimento", "Categoria", "Subcategoria"]:
+        if col in df.columns:
+            df[col] = df[col].astype(str).str.strip().str.title()
+
+    # Valores (limpeza vetorizada, ver limpeza.py)
+    with medicao.etapa("limpar_valores", len(df)):
+        df["Valor_R$"] = limpeza.limpar_valores(df["Valor_R$"])
+
+    # --- 2. LÓGICA DO ÁRBITRO "EH PARCELA" ---
+
+    # Garante que EhParcela seja 0 ou 1
+    if "EhParcela" in df.columns:
+        # Converte tudo para numérico, erros viram 0 (Não)
+        df["EhParcela"] = (
+            pd.to_numeric(df["EhParcela"], errors="coerce").fillna(0).astype(int)
+        )
+    else:
+        df["EhParcela"] = 0
+
+    # --- EXTRAÇÃO ROBUSTA DE PARCELAS (vetorizada, ver limpeza.py) ---
+    with medicao.etapa("limpar_parcelas", len(df)):
+        df["ParcelaAtual"] = limpeza.limpar_parcelas_atuais(df["ParcelaAtual"])
+        df["TotalParcelas"] = limpeza.limpar_totais_parcelas(df["TotalParcelas"])
+
+    # Trava de Segurança Extra (Mantida)
+    mask_erro = (df["TotalParcelas"] > 60) | (df["TotalParcelas"] < 1)
+    df.loc[mask_erro, "TotalParcelas"] = 1
+    df.loc[mask_erro, "ParcelaAtual"] = 1
+
+    # --- CORREÇÃO: Sincronização de Parcelas ---
+    # Se TotalParcelas > 1, garante que a flag EhParcela seja 1 (Verdadeiro)
+    df.loc[df["TotalParcelas"] > 1, "EhParcela"] = 1
+
+    # --- 3. CÁLCULO DE PASSIVO BLINDADO ---
+    # Só calcula passivo SE EhParcela for 1 (Verdadeiro)
+    # np.where(CONDIÇÃO, VALOR_SE_SIM, VALOR_SE_NAO)
+    df["Passivo_Futuro"] = np.where(
+        df["EhParcela"] == 1,
+        (df["TotalParcelas"] - df["ParcelaAtual"]) * df["Valor_R$"],
+        0.0,  # Se não for parcela, dívida futura é ZERO
+    )
+
+    df["Passivo_Futuro"] = df["Passivo_Futuro"].clip(lower=0)
+
+    # Categorias
+    if "Categoria" in df.columns:
+        df["Tipo_Gasto"] = limpeza.classificar_tipo_gasto(df["Categoria"])
+    else:
+        df["Tipo_Gasto"] = "Indefinido"
+
+    return df
+
+
+def _inteiro_estreito(serie, dtype):
+    """Converte para o inteiro declarado; mantém int64 se algum valor não couber."""
+    serie = pd.to_numeric(serie, errors="coerce").fillna(0).astype("int64")
+    limites = np.iinfo(dtype)
+    if serie.empty or (serie.min() >= limites.min and serie.max() <= limites.max):
+        return serie.astype(dtype)
+    return serie
+
+
+def _tipar(df):
+    """Aplica os tipos de ESQUEMA que não dependem dos outros meses (tudo menos categorias)."""
+    for col in df.columns:
+        tipo = ESQUEMA.get(col, "texto")
+        if tipo == "datetime64[ns]":
+            continue
+        if tipo == "float64":
+            df[col] = df[col].astype("float64")
+        elif tipo == "valor":
+            df[col] = limpeza.limpar_valores(df[col])
+        elif tipo.startswith("int"):
+            df[col] = _inteiro_estreito(df[col], tipo)
+        elif tipo == "string[pyarrow]":
+            df[col] = df[col].astype(tipo)
+        else:
+            df[col] = df[col].astype(object).where(df[col].isna(), df[col].astype(str))
+    return df
+
+
+def aplicar_esquema(df):
+    """
+    Converte o DataFrame consolidado para as categorias de ESQUEMA.
+
+    Também é aplicado na leitura do Parquet, que devolve string[pyarrow] como
+    string[python] (várias vezes maior em memória).
+    """
+    for col in df.columns:
+        tipo = ESQUEMA.get(col)
+        if tipo == "string[pyarrow]":
+            df[col] = df[col].astype(tipo)
+        elif tipo == "categoria":
+            df[col] = df[col].astype("category")
+        elif tipo == "mes":
+            df[col] = pd.Categorical(
+                df[col], categories=sorted(df[col].dropna().unique()), ordered=True
+            )
+    return df
+
+
+def anexar_colunas_view(df):
+    """
+    Cria Valor_View/Passivo_View como apelidos das colunas de origem.
+
+    Com copy-on-write ligado (app.py) a atribuição não copia os dados: as duas
+    colunas compartilham o mesmo buffer até alguém escrever em uma delas.
+    """
+    for view, origem in COLUNAS_VIEW.items():
+        if origem in df.columns:
+            df[view] = df[origem]
+    return df
+
+
+def relatorio_memoria(df):
+    """Bytes ocupados pelo DataFrame (buffers compartilhados contam uma vez)."""
+    uso = df.memory_usage(deep=True, index=True)
+    for view, origem in COLUNAS_VIEW.items():
+        if view in df.columns and origem in df.columns and np.shares_memory(
+            df[view].to_numpy(), df[origem].to_numpy()
+        ):
+            uso = uso.drop(view)
+    total = int(uso.sum())
+    return {
+        "linhas": len(df),
+        "bytes": total,
+        "bytes_por_linha": total / len(df) if len(df) else 0.0,
+    }
+
+
+# ── ARMAZÉM COLUNAR ───────────────────────────────────────────────────────────
+
+
+def _listar_csvs(dir_raw):
+    return sorted(Path(dir_raw).glob("*.csv"))
+
+
+def _ler_manifesto(dir_proc):
+    caminho = Path(dir_proc) / ARQUIVO_MANIFESTO
+    if not caminho.exists():
+        return {"arquivos": {}}
+    try:
+        manifesto = json.loads(caminho.read_text())
+    except (OSError, json.JSONDecodeError):
+        return {"arquivos": {}}
+    # Parquets gravados com outro esquema são descartados e refeitos
+    if manifesto.get("versao") != VERSAO_ESQUEMA:
+        return {"arquivos": {}}
+    return manifesto
+
+
+def _gravar_manifesto(dir_proc, manifesto):
+    caminho = Path(dir_proc) / ARQUIVO_MANIFESTO
+    tmp = caminho.with_suffix(".tmp")
+    tmp.write_text(json.dumps(manifesto, ensure_ascii=False, indent=2))
+    os.replace(tmp, caminho)
+
+
+def _gravar_parquet(df, caminho):
+    """Grava de forma atômica para o dashboard nunca ler um arquivo pela metade."""
+    tmp = caminho.with_suffix(".tmp")
+    try:
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, caminho)
+    except OSError:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def armazem_atualizado(dir_raw=DIR_RAW, dir_proc=DIR_PROCESSADO):
+    """True se o consolidado corresponde exatamente aos CSVs atuais de data/raw/."""
+    if not (Path(dir_proc) / ARQUIVO_CONSOLIDADO).exists():
+        return False
+    registrados = _ler_manifesto(dir_proc).get("arquivos", {})
+    atuais = {f.name: validacao.fingerprint(f) for f in _listar_csvs(dir_raw)}
+    return atuais == {
+        nome: {"mtime": info["mtime"], "tamanho": info["tamanho"]}
+        for nome, info in registrados.items()
+    }
+
+
+def _hash_manifesto(arquivos):
+    conteudo = json.dumps(arquivos, sort_keys=True).encode()
+    return hashlib.sha1(conteudo).hexdigest()[:16]
+
+
+def versao_armazem(dir_proc=DIR_PROCESSADO):
+    """Hash curto do manifesto: muda sempre que algum CSV do armazém muda (resultados.py)."""
+    return _hash_manifesto(_ler_manifesto(dir_proc).get("arquivos", {}))
+
+
+def processar_arquivo(caminho):
+    """Lê e limpa um único CSV mensal (já validado), devolvendo o DataFrame tipado."""
+    with medicao.etapa("ler_csv") as e:
+        df = ler_csv(caminho)
+        e.linhas = len(df)
+    with medicao.etapa("limpar_dados", len(df)):
+        df = limpar_dados(df)
+    with medicao.etapa("tipar", len(df)):
+        return _tipar(df)
+
+
+def _buscar_em_cache(caminho, fingerprint, registro, dir_proc):
+    """
+    Devolve o DataFrame limpo de um CSV inalterado, lido do Parquet do mês, ou
+    None se precisa processar (fingerprint diferente do manifesto ou sem Parquet).
+
+    Nada fica em memória entre cargas: os meses limpos ainda têm texto em object
+    e ocupariam várias vezes o dataset compacto compartilhado pelo dashboard.
+    """
+    destino = dir_proc / f"{caminho.stem}.parquet"
+    mesmo_arquivo = registro is not None and all(
+        registro.get(k) == v for k, v in fingerprint.items()
+    )
+    if mesmo_arquivo and destino.exists():
+        return pd.read_parquet(destino)
+    return None
+
+
+def _processar_e_gravar(caminho, dir_proc):
+    """
+    Processa um CSV e grava o Parquet do mês; devolve (df, erro_csv, erro_gravacao).
+
+    erro_csv é defeito do próprio arquivo (leitura/limpeza) e leva à quarentena.
+    erro_gravacao é falha de disco em data/processed/: o df vale para esta carga
+    e o CSV fica em data/raw/. Qualquer outro erro sobe.
+    """
+    try:
+        df_arquivo = processar_arquivo(caminho)
+    except (pd.errors.ParserError, ValueError, KeyError) as e:
+        return None, str(e), None
+    try:
+        _gravar_parquet(df_arquivo, Path(dir_proc) / f"{caminho.stem}.parquet")
+    except OSError as e:
+        return df_arquivo, None, str(e)
+    return df_arquivo, None, None
+
+
+def _processar_pendentes(caminhos, dir_proc, processos=None):
+    """
+    Processa os CSVs pendentes, em paralelo quando são muitos.
+
+    O resultado segue a ordem de `caminhos` (pool.map preserva a ordem), então a
+    saída é a mesma do modo serial. Usa "spawn" porque o servidor do Streamlit é
+    multi-thread e fork nesse cenário pode travar.
+    """
+    processos = processos or INGESTAO_MAX_PROCESSOS or os.cpu_count() or 1
+    n_processos = min(processos, len(caminhos))
+    if len(caminhos) < INGESTAO_MIN_ARQUIVOS_PARALELO or n_processos <= 1:
+        return [_processar_e_gravar(c, dir_proc) for c in caminhos]
+
+    with ProcessPoolExecutor(
+        max_workers=n_processos, mp_context=multiprocessing.get_context("spawn")
+    ) as pool:
+        return list(
+            pool.map(
+                _processar_e_gravar,
+                caminhos,
+                [dir_proc] * len(caminhos),
+                chunksize=max(1, len(caminhos) // (n_processos * 4)),
+            )
+        )
+
+
+def sincronizar(dir_raw=DIR_RAW, dir_proc=DIR_PROCESSADO, forcar=False, processos=None):
+    """
+    Atualiza o armazém colunar a partir de data/raw/.
+
+    Só os CSVs novos ou alterados (mtime/tamanho diferentes do manifesto) são lidos
+    e limpos, num pool de processos quando são muitos; os demais vêm do Parquet do
+    mês. Com forcar=True tudo é reprocessado;
+    processos limita o pool (1 = serial).
+
+    Retorna (df_consolidado, avisos), onde avisos é uma lista de (arquivo, mensagem)
+    dos CSVs reparados ou movidos para a quarentena nesta chamada. Cada problema
+    aparece uma única vez: o arquivo sai de data/raw/ ou passa a ser válido.
+    Falha ao gravar em data/processed/ (disco cheio, permissão) não é problema do
+    CSV: vira aviso, o arquivo fica em data/raw/ e o df desta carga vem da memória.
+
+    df.attrs["versao_armazem"] é a versao_armazem() do que foi gravado, ou None se
+    o armazém não ficou igual a data/raw/ (gravação falhou): quem chama não
+    precisa listar os CSVs de novo com armazem_atualizado().
+    """
+    dir_proc = Path(dir_proc)
+    dir_proc.mkdir(parents=True, exist_ok=True)
+
+    registrados = _ler_manifesto(dir_proc).get("arquivos", {})
+    manifesto = {"versao": VERSAO_ESQUEMA, "arquivos": {}}
+
+    # Arquivos tortos são reparados (ou postos em quarentena) antes de tudo;
+    # reparar regrava o CSV, então a lista é refeita depois.
+    with medicao.etapa("validar"):
+        avisos = validacao.validar_arquivos(_listar_csvs(dir_raw), dir_proc)
+    arquivos = _listar_csvs(dir_raw)
+    fingerprints = {f.name: validacao.fingerprint(f) for f in arquivos}
+    prontos = {}
+    pendentes = []
+    for f in arquivos:
+        df_arquivo = None
+        if not forcar:
+            df_arquivo = _buscar_em_cache(
+                f, fingerprints[f.name], registrados.get(f.name), dir_proc
+            )
+        if df_arquivo is None:
+            pendentes.append(f)
+        else:
+            prontos[f.name] = df_arquivo
+
+    with medicao.etapa("processar_pendentes", len(pendentes)):
+        resultados = _processar_pendentes(pendentes, dir_proc, processos)
+    nao_gravados = set()
+    for f, (df_arquivo, erro, erro_gravacao) in zip(pendentes, resultados):
+        if erro is not None:
+            avisos.append((f.name, validacao.quarentenar(f, erro, dir_proc)))
+            continue
+        if erro_gravacao is not None:
+            # Fora do manifesto: a próxima carga tenta gravar de novo
+            avisos.append((f.name, f"Parquet do mês não gravado ({erro_gravacao}); o CSV continua em data/raw/."))
+            nao_gravados.add(f.name)
+        prontos[f.name] = df_arquivo
+
+    # Ordem fixa (nome do arquivo) para o consolidado ser determinístico
+    lista_dfs = []
+    for f in arquivos:
+        if f.name in prontos:
+            if f.name not in nao_gravados:
+                manifesto["arquivos"][f.name] = {
+                    **fingerprints[f.name], "parquet": f"{f.stem}.parquet"
+                }
+            lista_dfs.append(prontos[f.name])
+
+    # Remove meses cujo CSV não existe mais
+    validos = {info["parquet"] for info in manifesto["arquivos"].values()}
+    for p in dir_proc.glob("*.parquet"):
+        if p.name != ARQUIVO_CONSOLIDADO and p.name not in validos:
+            p.unlink()
+
+    if lista_dfs:
+        # Linhas agrupadas por mês: cada mês vira um bloco contíguo (ver particao.py)
+        with medicao.etapa("consolidar") as e:
+            df = particao.ordenar_por_mes(
+                aplicar_esquema(pd.concat(lista_dfs, ignore_index=True))
+            )
+            e.linhas = len(df)
+        try:
+            with medicao.etapa("gravar_parquet", len(df)):
+                _gravar_parquet(df, dir_proc / ARQUIVO_CONSOLIDADO)
+        except OSError as e:
+            # Manifesto antigo fica: o armazém não bate com data/raw/ e a próxima carga refaz
+            avisos.append((ARQUIVO_CONSOLIDADO, f"Armazém não gravado ({e}); dados desta carga só em memória."))
+            df.attrs["versao_armazem"] = None
+            return df, avisos
+    else:
+        df = None
+        (dir_proc / ARQUIVO_CONSOLIDADO).unlink(missing_ok=True)
+
+    versao = None
+    try:
+        _gravar_manifesto(dir_proc, manifesto)
+        if not nao_gravados:
+            versao = _hash_manifesto(manifesto["arquivos"])
+    except OSError as e:
+        avisos.append((ARQUIVO_MANIFESTO, f"Manifesto não gravado ({e}); a próxima carga refaz o armazém."))
+    if df is not None:
+        df.attrs["versao_armazem"] = versao
+    return df, avisos
+
+
+def ler_armazem(dir_proc=DIR_PROCESSADO):
+    """Dataset do Parquet consolidado, sem conferir data/raw/ (isso é armazem_atualizado)."""
+    with medicao.etapa("ler_parquet") as e:
+        df = aplicar_esquema(pd.read_parquet(Path(dir_proc) / ARQUIVO_CONSOLIDADO))
+        e.linhas = len(df)
+    df.attrs["versao_armazem"] = versao_armazem(dir_proc)
+    return df
+
+
+def carregar_consolidado(dir_raw=DIR_RAW, dir_proc=DIR_PROCESSADO):
+    """
+    Lê o dataset limpo direto do Parquet consolidado, já no ESQUEMA compacto.
+
+    Só reprocessa os CSVs quando data/raw/ mudou desde a última ingestão.
+    As colunas *_View não vêm junto; use anexar_colunas_view.
+    Retorna (df, avisos); df é None se não houver dados.
+    """
+    if armazem_atualizado(dir_raw, dir_proc):
+        return ler_armazem(dir_proc), []
+    with medicao.etapa("sincronizar"):
+        return sincronizar(dir_raw, dir_proc)
+
+
+# ── MAIN ──────────────────────────────────────────────────────────────────────
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Converte os CSVs de data/raw/ no armazém Parquet do dashboard."
+    )
+    parser.add_argument("--rebuild", action="store_true", help="Reconstrói tudo do zero")
+    parser.add_argument(
+        "--processos", type=int, metavar="N", help="Máximo de processos (1 = serial)"
+    )
+    args = parser.parse_args()
+
+    # Mesmo modo do app.py, para o relatório de memória refletir o dashboard
+    pd.set_option("mode.copy_on_write", True)
+
+    inicio = time.perf_counter()
+    if args.rebuild or not armazem_atualizado(DIR_RAW, DIR_PROCESSADO):
+        df, avisos = sincronizar(forcar=args.rebuild, processos=args.processos)
+    else:
+        df, avisos = ler_armazem(), []
+    duracao = time.perf_counter() - inicio
+
+    for nome, msg in avisos:
+        print(f"⚠  {nome}: {msg}")
+
+    if df is None:
+        print(f"Nenhum CSV válido encontrado em {DIR_RAW}/")
+        return
+
+    memoria = relatorio_memoria(anexar_colunas_view(df))
+    print(f"✅ {len(df)} transações em {DIR_PROCESSADO / ARQUIVO_CONSOLIDADO} ({duracao:.2f}s)")
+    print(
+        f"💾 Em memória: {memoria['bytes'] / 1024 ** 2:.1f} MB "
+        f"({memoria['bytes_por_linha']:.0f} bytes/linha)"
+    )
+
+
+if __name__ == "__main__":
+    main()
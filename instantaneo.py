@@ -0,0 +1,127 @@
+"""
+instantaneo.py — Instantâneo em disco do dataset limpo e do cubo, para reinícios rápidos.
+
+O dataset já limpo e tipado (com Passivo_Futuro, Tipo_Gasto etc.) vai para um
+Feather sem compressão, lido com memory map; o cubo de agregados (agregados.py)
+vai em pickle. Os dois são carimbados com a versão do armazém
+(ingestao.versao_armazem, um hash das fingerprints de data/raw/) e só valem para
+ela: depois de um reboot o servidor pula limpeza, leitura do Parquet e
+construção do cubo.
+
+Qualquer problema (arquivo ausente ou truncado, versão, esquema ou pandas
+diferentes) devolve None e quem chamou refaz a partir do armazém.
+"""
+
+import json
+import os
+import pickle
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.feather as feather
+
+import ingestao
+
+ARQUIVO_DADOS = "instantaneo.feather"
+ARQUIVO_CUBO = "instantaneo_cubo.pkl"
+ARQUIVO_CARIMBO = "instantaneo.json"
+
+# Mude quando o conteúdo gravado mudar de forma
+VERSAO_FORMATO = 1
+
+
+def _carimbo(dir_proc):
+    try:
+        return json.loads((Path(dir_proc) / ARQUIVO_CARIMBO).read_text())
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def _valido(carimbo, chave, versao):
+    return (
+        carimbo.get(chave) == versao
+        and carimbo.get("formato") == VERSAO_FORMATO
+        and carimbo.get("esquema") == ingestao.VERSAO_ESQUEMA
+        and carimbo.get("pandas") == pd.__version__
+    )
+
+
+def _carimbar(dir_proc, chave, versao):
+    carimbo = _carimbo(dir_proc)
+    if carimbo.get("formato") != VERSAO_FORMATO or carimbo.get("pandas") != pd.__version__:
+        carimbo = {}
+    carimbo.update({
+        chave: versao,
+        "formato": VERSAO_FORMATO,
+        "esquema": ingestao.VERSAO_ESQUEMA,
+        "pandas": pd.__version__,
+    })
+    _gravar_atomico(
+        Path(dir_proc) / ARQUIVO_CARIMBO,
+        lambda tmp: tmp.write_text(json.dumps(carimbo, indent=2)),
+    )
+
+
+def _gravar_atomico(caminho, gravar):
+    """Grava em caminho + ".tmp" e troca de uma vez: quem lê nunca vê arquivo pela metade."""
+    tmp = caminho.with_name(caminho.name + ".tmp")
+    try:
+        gravar(tmp)
+        os.replace(tmp, caminho)
+    except OSError:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def _gravar_carimbado(dir_proc, chave, versao, arquivo, gravar):
+    # Descarimba antes de trocar o arquivo: se o processo morrer no meio, o
+    # carimbo antigo não passa a descrever o arquivo novo.
+    try:
+        _carimbar(dir_proc, chave, None)
+        _gravar_atomico(Path(dir_proc) / arquivo, gravar)
+        _carimbar(dir_proc, chave, versao)
+    except OSError:
+        pass  # instantâneo é só atalho: sem disco, o próximo start refaz do armazém
+
+
+def ler_dados(versao, dir_proc=ingestao.DIR_PROCESSADO):
+    """Dataset no ESQUEMA compacto (sem as colunas *_View), ou None se não vale para versao."""
+    caminho = Path(dir_proc) / ARQUIVO_DADOS
+    if not _valido(_carimbo(dir_proc), "dados", versao) or not caminho.exists():
+        return None
+    try:
+        df = feather.read_feather(caminho, memory_map=True)
+    except (OSError, ValueError):
+        return None
+    # O Feather preserva categorias e inteiros estreitos; string[pyarrow] volta como string[python]
+    return ingestao.aplicar_esquema(df)
+
+
+def gravar_dados(df, versao, dir_proc=ingestao.DIR_PROCESSADO):
+    """Grava o dataset (só as colunas do armazém) para a versão dada."""
+    colunas = [c for c in df.columns if c not in ingestao.COLUNAS_VIEW]
+    _gravar_carimbado(
+        dir_proc, "dados", versao, ARQUIVO_DADOS,
+        lambda tmp: feather.write_feather(df[colunas], tmp, compression="uncompressed"),
+    )
+
+
+def ler_cubo(versao, dir_proc=ingestao.DIR_PROCESSADO):
+    """Cubo de agregados gravado para a versão dada, ou None."""
+    caminho = Path(dir_proc) / ARQUIVO_CUBO
+    if not _valido(_carimbo(dir_proc), "cubo", versao) or not caminho.exists():
+        return None
+    try:
+        with open(caminho, "rb") as f:
+            return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        return None
+
+
+def gravar_cubo(cubo, versao, dir_proc=ingestao.DIR_PROCESSADO):
+    """Grava o cubo (com as janelas) para a versão dada."""
+    def gravar(tmp):
+        with open(tmp, "wb") as f:
+            pickle.dump(cubo, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    _gravar_carimbado(dir_proc, "cubo", versao, ARQUIVO_CUBO, gravar)
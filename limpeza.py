@@ -0,0 +1,134 @@
+"""
+limpeza.py — Limpeza vetorizada das colunas de valor e parcelas.
+
+Substitui os Series.apply linha a linha por operações de coluna (acessor .str do
+pandas + máscaras NumPy), com o mesmo resultado das funções escalares originais
+(conferido por paridade.py).
+"""
+
+import functools
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+
+from constants import CATS_ESSENCIAIS
+
+
+# ── VETORIZADO ────────────────────────────────────────────────────────────────
+
+
+def _como_float(serie, texto):
+    """Equivalente a float(val) elemento a elemento; NaN onde float() falharia."""
+    if is_numeric_dtype(serie):
+        return serie.astype("float64")
+    return pd.to_numeric(texto, errors="coerce").astype("float64")
+
+
+def _por_valores_unicos(funcao):
+    """
+    Aplica a limpeza só sobre os valores distintos e espalha o resultado pelas linhas.
+
+    Colunas como ParcelaAtual/TotalParcelas têm poucas dezenas de valores distintos
+    ("01/10", 3.0, ...) mesmo com anos de histórico, então o trabalho de texto
+    passa a ser proporcional à cardinalidade, não ao número de linhas.
+    """
+    @functools.wraps(funcao)
+    def _aplicar(serie):
+        codigos, unicos = pd.factorize(serie, use_na_sentinel=False)
+        if len(unicos) == len(serie):
+            return funcao(serie)
+        limpos = funcao(pd.Series(unicos, dtype=serie.dtype))
+        return pd.Series(limpos.to_numpy()[codigos], index=serie.index)
+
+    return _aplicar
+
+
+def _eh_inteiro_valido(num):
+    """Máscara de números não nulos, inteiros e >= 1."""
+    return num.notna() & (num >= 1) & (num % 1 == 0)
+
+
+@_por_valores_unicos
+def limpar_valores(serie):
+    """Converte valores monetários (BR, internacional ou já numéricos) para float; inválidos viram 0.0."""
+    if is_numeric_dtype(serie):
+        return serie.astype("float64").fillna(0.0)
+
+    # Números soltos numa coluna object viram texto sem perda (repr do float é exato)
+    texto = serie.astype(str).str.strip()
+    texto = texto.str.replace("R$", "", regex=False).str.strip()
+
+    n_pontos = texto.str.count(r"\.")
+    n_virgulas = texto.str.count(",")
+
+    # Formato brasileiro: 1.234,56 (ponto como milhar, vírgula como decimal)
+    mask_br = (n_pontos >= 1) & (n_virgulas == 1)
+    # Só tem vírgula: 1234,56
+    mask_virgula = ~mask_br & (n_virgulas >= 1) & (n_pontos == 0)
+
+    texto = texto.mask(
+        mask_br, texto.str.replace(".", "", regex=False).str.replace(",", ".", regex=False)
+    )
+    texto = texto.mask(mask_virgula, texto.str.replace(",", ".", regex=False))
+
+    return pd.to_numeric(texto, errors="coerce").astype("float64").fillna(0.0)
+
+
+@_por_valores_unicos
+def limpar_parcelas_atuais(serie):
+    """Extrai a parcela atual de cada linha. Ex: '01/10' -> 1, 3.0 -> 3."""
+    texto = serie.astype(str).str.strip()
+    num = _como_float(serie, texto)
+
+    primeiro = (
+        pd.to_numeric(texto.str.extract(r"(\d+)", expand=False), errors="coerce")
+        .astype("float64")
+        .fillna(1)
+    )
+
+    return primeiro.where(~_eh_inteiro_valido(num), num).astype(int)
+
+
+@_por_valores_unicos
+def limpar_totais_parcelas(serie):
+    """Extrai o total de parcelas de cada linha. Ex: '01/10' -> 10, 12.0 -> 12."""
+    texto = serie.astype(str).str.strip()
+    num = _como_float(serie, texto)
+
+    vazio = (texto == "") | (texto.str.lower() == "nan")
+
+    # Proteção contra Dinheiro: '12,50' é centavo, '12,00' é 12
+    num_virgula = pd.to_numeric(
+        texto.str.replace(",", ".", regex=False), errors="coerce"
+    )
+    inteiro_virgula = num_virgula.notna() & (num_virgula % 1 == 0)
+    centavo = num_virgula.notna() & ~inteiro_virgula
+
+    # Lógica da Barra: para o TOTAL, queremos o último número (o denominador)
+    ultimo = (
+        pd.to_numeric(texto.str.extract(r"(\d+)\D*$", expand=False), errors="coerce")
+        .astype("float64")
+        .fillna(1)
+    )
+
+    resultado = np.select(
+        [
+            _eh_inteiro_valido(num),
+            vazio,
+            inteiro_virgula & (num_virgula >= 1),
+            centavo,
+        ],
+        [num, 1, num_virgula, 1],
+        default=ultimo,
+    )
+    return pd.Series(resultado, index=serie.index).astype(int)
+
+
+def classificar_tipo_gasto(categorias):
+    """Essencial se a categoria está em CATS_ESSENCIAIS, senão Estilo de Vida."""
+    return pd.Series(
+        np.where(categorias.isin(CATS_ESSENCIAIS), "Essencial", "Estilo de Vida"),
+        index=categorias.index,
+    )
+
@@ -0,0 +1,220 @@
+"""
+medicao.py — Tempo, memória e linhas por etapa (ingestão, cálculos, abas).
+
+    with medicao.etapa("ler_csv") as e:
+        df = ler_csv(caminho)
+        e.linhas = len(df)
+
+    @medicao.medir("utils.detectar_anomalias")
+    def detectar_anomalias(...): ...
+
+Etapas aninhadas guardam o caminho completo ("carregar_dados/sincronizar/ler_csv")
+e o tempo próprio (sem as filhas): o tempo de uma aba menos o das suas etapas é,
+na prática, a montagem das figuras Plotly. Cada medição vai para um buffer em
+memória (painel de desempenho do app.py) e é acrescentada a MEDICAO_LOG em JSONL.
+
+Desligado (padrão), etapa() devolve um objeto vazio compartilhado e medir() só
+testa uma flag antes de chamar a função. Liga com ativar(True) ou com a variável
+de ambiente FATURA_MEDICAO=1 (que também vale para os processos da ingestão).
+No dashboard cada sessão pede com ativar(ligado, sessao=...): a medição fica
+ligada enquanto ao menos uma sessão quiser, e cada painel filtra os registros
+pelo identificador da thread do próprio rerun.
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+
+from constants import MEDICAO_LOG, MEDICAO_MAX_REGISTROS, MEDICAO_SESSAO_EXPIRA
+
+_estado = {
+    "ativo": os.environ.get("FATURA_MEDICAO") == "1",
+    "processo": os.environ.get("FATURA_MEDICAO") == "1",
+    "sequencia": 0,
+}
+_SESSOES = {}  # sessão que pediu medição -> último pedido (time.monotonic)
+_REGISTROS = deque(maxlen=MEDICAO_MAX_REGISTROS)
+_TRAVA = threading.Lock()
+_local = threading.local()
+
+try:
+    _BYTES_PAGINA = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):
+    _BYTES_PAGINA = 4096
+
+
+def _memoria_residente():
+    """Memória residente do processo em bytes (Linux); None onde /proc não existe."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _BYTES_PAGINA
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def ativar(ligado=True, sessao=None):
+    """
+    Sem sessao, liga/desliga para o processo todo (CLI, FATURA_MEDICAO).
+
+    Com sessao, registra o pedido daquela sessão do dashboard: um rerun não
+    desliga a medição que outra sessão (ou a thread de aquecimento) está usando.
+    Pedidos não renovados por MEDICAO_SESSAO_EXPIRA segundos (aba fechada) caem.
+    """
+    with _TRAVA:
+        agora = time.monotonic()
+        if sessao is None:
+            _estado["processo"] = bool(ligado)
+        elif ligado:
+            _SESSOES[sessao] = agora
+        else:
+            _SESSOES.pop(sessao, None)
+        for outra, visto in list(_SESSOES.items()):
+            if agora - visto > MEDICAO_SESSAO_EXPIRA:
+                del _SESSOES[outra]
+        _estado["ativo"] = _estado["processo"] or bool(_SESSOES)
+
+
+def ativo(sessao=None):
+    """Se algo está sendo medido; com sessao, se a medição vale para ela."""
+    if sessao is None:
+        return _estado["ativo"]
+    return _estado["processo"] or sessao in _SESSOES
+
+
+class _Etapa:
+    __slots__ = ("nome", "linhas", "_inicio", "_memoria", "_filhas")
+
+    def __init__(self, nome, linhas):
+        self.nome = nome
+        self.linhas = linhas
+
+    def __enter__(self):
+        pilha = _pilha()
+        if pilha:
+            self.nome = f"{pilha[-1].nome}/{self.nome}"
+        pilha.append(self)
+        self._filhas = 0.0
+        self._memoria = _memoria_residente()
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        segundos = time.perf_counter() - self._inicio
+        memoria = _memoria_residente()
+        pilha = _pilha()
+        pilha.pop()
+        if pilha:
+            pilha[-1]._filhas += segundos
+        delta = None
+        if memoria is not None and self._memoria is not None:
+            delta = round((memoria - self._memoria) / 1024 ** 2, 2)
+        _registrar({
+            "momento": datetime.now().isoformat(timespec="milliseconds"),
+            "etapa": self.nome,
+            "segundos": round(segundos, 6),
+            "proprios": round(segundos - self._filhas, 6),
+            "memoria_mb": delta,
+            "linhas": self.linhas,
+            "thread": threading.current_thread().name,
+            "thread_id": threading.get_ident(),
+            "pid": os.getpid(),
+        })
+        return False
+
+
+class _EtapaNula:
+    """Etapa desligada: um único objeto, sem relógio nem registro."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, nome, valor):
+        pass
+
+
+_NULA = _EtapaNula()
+
+
+def _pilha():
+    if not hasattr(_local, "pilha"):
+        _local.pilha = []
+    return _local.pilha
+
+
+def etapa(nome, linhas=None):
+    """Context manager que mede a etapa; atribua .linhas dentro do bloco se souber."""
+    if not _estado["ativo"]:
+        return _NULA
+    return _Etapa(nome, linhas)
+
+
+def _contar_linhas(resultado):
+    if isinstance(resultado, tuple):
+        resultado = next((r for r in resultado if r is not None), None)
+    if resultado is None or isinstance(resultado, (str, bytes, dict)):
+        return None
+    try:
+        return len(resultado)
+    except TypeError:
+        return None
+
+
+def medir(nome):
+    """Decorador: mede cada chamada como uma etapa, com o nº de linhas do resultado."""
+
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def envolvida(*args, **kwargs):
+            if not _estado["ativo"]:
+                return funcao(*args, **kwargs)
+            with _Etapa(nome, None) as e:
+                resultado = funcao(*args, **kwargs)
+                e.linhas = _contar_linhas(resultado)
+            return resultado
+
+        return envolvida
+
+    return decorador
+
+
+def _registrar(registro):
+    with _TRAVA:
+        _estado["sequencia"] += 1
+        _REGISTROS.append((_estado["sequencia"], registro))
+        try:
+            caminho = Path(MEDICAO_LOG)
+            caminho.parent.mkdir(parents=True, exist_ok=True)
+            with open(caminho, "a", encoding="utf-8") as f:
+                f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+        except OSError:
+            pass  # sem disco gravável: fica só no buffer em memória
+
+
+def marcador():
+    """Posição atual do buffer; registros(desde=...) devolve só o que veio depois."""
+    with _TRAVA:
+        return _estado["sequencia"]
+
+
+def registros(desde=0, thread_id=None):
+    """
+    Medições em memória, da mais antiga para a mais recente.
+
+    thread_id (threading.get_ident()) restringe a uma thread: no Streamlit todas
+    as sessões rodam em threads com o mesmo nome, mas identificadores distintos.
+    """
+    with _TRAVA:
+        lista = [r for seq, r in _REGISTROS if seq > desde]
+    if thread_id is not None:
+        lista = [r for r in lista if r["thread_id"] == thread_id]
+    return lista
@@ -0,0 +1,198 @@
+"""
+nucleo.py — ETL e análises do dashboard sem Streamlit (só pandas/NumPy).
+
+Tudo o que o dashboard calcula está aqui e pode ser usado por scripts, jobs em
+lote e processos de trabalho sem importar streamlit, plotly ou matplotlib.
+utils.py é só o adaptador: põe o carregamento em st.cache_resource, mostra os
+avisos na interface e dá a versão dos dados pelo observer de data/raw/ (vigia.py,
+que o núcleo não importa).
+"""
+
+import pandas as pd
+
+import agregados
+import anomalias
+import ingestao
+import instantaneo
+import medicao
+import particao
+import projecao
+import resultados
+
+
+@medicao.medir("carregar_dados")
+def carregar_dados():
+    """
+    Dataset compacto (ingestao.ESQUEMA), agrupado por mês, com Valor_View/Passivo_View como apelidos.
+
+    Retorna (df, avisos); df é None se não houver dados. Avisos de
+    reparo/quarentena (validacao.py) chegam uma vez só por arquivo.
+    df.attrs["versao_armazem"] diz de qual versão do armazém ele veio.
+    """
+    # Com data/raw/ igual ao armazém, o instantâneo (instantaneo.py) evita até a
+    # leitura do Parquet; senão o ETL de ingestao.py reprocessa só os CSVs que
+    # mudaram e o instantâneo é refeito. armazem_atualizado() lista data/raw/ uma
+    # vez só: depois de sincronizar(), a versão gravada vem em df.attrs.
+    avisos = []
+    if ingestao.armazem_atualizado():
+        versao = ingestao.versao_armazem()
+        with medicao.etapa("ler_instantaneo"):
+            df = instantaneo.ler_dados(versao)
+        gravar = df is None
+        if df is None:
+            df = ingestao.ler_armazem()
+    else:
+        with medicao.etapa("sincronizar"):
+            df, avisos = ingestao.sincronizar()
+        if df is None:
+            return None, avisos
+        # None = armazém não gravado (aviso de disco): sem instantâneo
+        versao = df.attrs["versao_armazem"]
+        gravar = versao is not None
+
+    if gravar:
+        with medicao.etapa("gravar_instantaneo", len(df)):
+            instantaneo.gravar_dados(df, versao)
+    df.attrs["versao_armazem"] = versao
+    with medicao.etapa("anexar_colunas_view", len(df)):
+        return ingestao.anexar_colunas_view(df), avisos
+
+
+@medicao.medir("carregar_cubo")
+def carregar_cubo(df):
+    """Cubo de agregados de carregar_dados(), do instantâneo quando ele é da mesma versão."""
+    versao = df.attrs.get("versao_armazem")
+    cubo = instantaneo.ler_cubo(versao) if versao is not None else None
+    if cubo is None:
+        cubo = agregados.construir_cubo(df)
+        if versao is not None:
+            instantaneo.gravar_cubo(cubo, versao)
+    return cubo
+
+
+def _fatiar_mes(df, meses, indice):
+    """Linhas de um mês (ou lista de meses) pelo índice de partições; sem índice, máscara sobre o df."""
+    if indice is not None:
+        return particao.fatiar(df, indice, meses)
+    if isinstance(meses, str):
+        return df[df["MesAno"] == meses]
+    return df[df["MesAno"].isin(meses)]
+
+
+def _garantir_cubo(df, cubo, *niveis):
+    """Usa o cubo já calculado; sem ele, agrega só os níveis necessários."""
+    if cubo is not None:
+        return cubo
+    return agregados.construir_cubo(df, niveis)
+
+
+# --- FUNÇÕES DE VISUALIZAÇÃO ---
+
+
+@medicao.medir("calcular_delta_meses")
+def calcular_delta_meses(df, mes_a, mes_b, cubo=None):
+    jan = agregados.janelas(_garantir_cubo(df, cubo, "mes", "categoria"))
+    valores_a, itens_a = agregados.categorias_no_mes(jan, mes_a)
+    valores_b, itens_b = agregados.categorias_no_mes(jan, mes_b)
+    presentes = (itens_a > 0) | (itens_b > 0)
+    df_delta = pd.DataFrame({
+        "Categoria": jan["categorias"][presentes],
+        f"Valor {mes_a}": valores_a[presentes],
+        f"Valor {mes_b}": valores_b[presentes],
+    })
+    df_delta["Diferença"] = df_delta[f"Valor {mes_a}"] - df_delta[f"Valor {mes_b}"]
+    return df_delta.sort_values("Diferença", ascending=False).reset_index(drop=True)
+
+
+@medicao.medir("processar_dados_futuros")
+def processar_dados_futuros(df_mes):
+    """(df_tabela, df_grafico) das parcelas ativas do mês (motor em projecao.py)."""
+    return projecao.projetar(df_mes)
+
+
+@medicao.medir("calcular_metricas_contexto")
+def calcular_metricas_contexto(df, mes_ref, cubo=None):
+    jan = agregados.janelas(_garantir_cubo(df, cubo, "mes", "categoria"))
+    posicoes = agregados.janela(jan, mes_ref, 6)
+    if posicoes is None:
+        return 0.0, 0.0, 0.0
+
+    inicio, pos = posicoes
+    totais = jan["totais"]
+    val_atual = totais[pos]
+    val_anterior = totais[pos - 1] if pos > 0 else 0.0
+    media_6m = totais[inicio:pos].mean() if pos > 0 else 0.0
+    return val_atual, val_anterior, media_6m
+
+
+@medicao.medir("buscar_historico_6m")
+def buscar_historico_6m(df_view, mes_ref, cubo=None):
+    """Totais dos 6 meses até mes_ref; o índice é a posição do mês nas janelas do cubo."""
+    cubo = _garantir_cubo(df_view, cubo, "mes", "categoria")
+    jan = agregados.janelas(cubo)
+    posicoes = agregados.janela(jan, mes_ref, 5)
+    if posicoes is None:
+        return pd.DataFrame()
+    inicio, pos = posicoes
+    return pd.DataFrame(
+        {
+            "MesAno": agregados.totais_mensais(cubo).index[inicio : pos + 1],
+            "Valor_View": jan["totais"][inicio : pos + 1],
+        },
+        index=pd.RangeIndex(inicio, pos + 1),
+    )
+
+
+@medicao.medir("gerar_df_media_historica")
+def gerar_df_media_historica(df_view, mes_ref, meses_janela=6, cubo=None):
+    jan = agregados.janelas(_garantir_cubo(df_view, cubo, "mes", "categoria"))
+    posicoes = agregados.janela(jan, mes_ref, meses_janela)
+    if posicoes is None or posicoes[0] == posicoes[1]:
+        return pd.DataFrame()
+    inicio, pos = posicoes
+    soma = jan["valor_categoria"][inicio:pos].sum(axis=0)
+    presentes = jan["itens_categoria"][inicio:pos].sum(axis=0) > 0
+    return pd.DataFrame({
+        "Categoria": jan["categorias"][presentes],
+        "Valor_Media": soma[presentes] / (pos - inicio),
+    })
+
+
+@medicao.medir("detectar_anomalias")
+def detectar_anomalias(df, mes_ref, cubo=None, indice=None):
+    """Retorna dict com listas de anomalias por tipo (motor em anomalias.py)."""
+    meses_hist = anomalias.janela_historica(
+        agregados.meses(_garantir_cubo(df, cubo, "mes")), mes_ref
+    )
+    if meses_hist is None:
+        return {}
+    return anomalias.detectar(
+        _fatiar_mes(df, mes_ref, indice), _fatiar_mes(df, meses_hist, indice), meses_hist
+    )
+
+
+# --- RESULTADOS POR ABA ---
+# Guardados no cache LRU de resultados.py por (versão dos dados, cálculo, mês).
+# versao_dados (utils.versao_dados() no dashboard, ingestao.versao_armazem() em
+# scripts) já identifica o DataFrame, o cubo e o índice.
+# Os resultados são compartilhados entre sessões: não altere o que receber.
+
+
+def anomalias_do_mes(df, cubo, indice, versao_dados, mes_ref):
+    return resultados.obter(
+        versao_dados, "anomalias", (mes_ref,),
+        lambda: detectar_anomalias(df, mes_ref, cubo=cubo, indice=indice),
+    )
+
+
+def projecao_do_mes(df_mes, versao_dados, mes_ref):
+    return resultados.obter(
+        versao_dados, "projecao", (mes_ref,), lambda: processar_dados_futuros(df_mes)
+    )
+
+
+def delta_dos_meses(df, cubo, versao_dados, mes_a, mes_b):
+    return resultados.obter(
+        versao_dados, "delta", (mes_a, mes_b),
+        lambda: calcular_delta_meses(df, mes_a, mes_b, cubo=cubo),
+    )
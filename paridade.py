@@ -0,0 +1,874 @@
+#!/usr/bin/env python3
+"""
+paridade.py — Confere os motores vetorizados contra as implementações originais.
+
+As versões escalares e com laços que o dashboard (e o classificador do
+parse_pdf.py) usavam antes ficam só aqui, como referência; os módulos de
+produção têm apenas o código que de fato roda. Os dados são as faturas
+sintéticas de benchmark.gerar_faturas, ingeridas num diretório temporário pelo
+mesmo caminho do dashboard (validacao.py + ingestao.py), e as regras e nomes de
+estabelecimento de benchmark.gerar_regras_e_nomes.
+
+A extração do parse_pdf.py roda contra um cliente falso do Gemini, sem rede:
+no lote, limite de PDFs em voo, novas tentativas, falha permanente e resumo;
+no streaming, o JSON cortado em pedaços, truncado ou inválido.
+
+Uso:
+    python paridade.py                         # 5 anos sintéticos
+    python paridade.py --anos 10 --transacoes 1000
+    python paridade.py --so limpeza
+    python paridade.py --so classificador --regras 10000
+    python paridade.py --so lote
+    python paridade.py --so stream
+"""
+
+import argparse
+import io
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from contextlib import redirect_stdout
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+import agregados
+import benchmark
+import ingestao
+import limpeza
+import nucleo
+import parse_pdf
+import particao
+import projecao
+from constants import (
+    ALERTA_ASSINATURA_MAX_CV,
+    ALERTA_ASSINATURA_MIN_MESES,
+    ALERTA_ASSINATURA_VARIACAO,
+    ALERTA_OUTLIER_FATOR,
+)
+from projecao import CHAVES_GRAFICO, COLUNAS_TABELA, _data_base
+
+ETAPAS = ("limpeza", "anomalias", "projecao", "classificador", "lote", "stream")
+ETAPAS_FATURAS = {"limpeza", "anomalias", "projecao"}  # precisam das faturas sintéticas
+
+
+# ── DADOS ─────────────────────────────────────────────────────────────────────
+
+
+def preparar(diretorio, anos, transacoes_mes, semente):
+    """
+    Gera as faturas em diretorio/data/raw e as ingere como o dashboard.
+
+    Retorna (brutos, df): as linhas dos CSVs como foram gravadas, antes do reparo
+    dos arquivos deslocados, e o dataset de ingestao.carregar_consolidado com as
+    colunas View. Roda com diretorio como cwd (a quarentena é relativa).
+    """
+    dir_raw = Path(diretorio) / "data" / "raw"
+    benchmark.gerar_faturas(dir_raw, anos, transacoes_mes, semente)
+    brutos = pd.concat(
+        [ingestao.ler_csv(caminho) for caminho in sorted(dir_raw.glob("*.csv"))],
+        ignore_index=True,
+    )
+    df, _ = ingestao.carregar_consolidado(dir_raw, Path(diretorio) / "data" / "processed")
+    return brutos, ingestao.anexar_colunas_view(df)
+
+
+def _iguais(a, b):
+    """DataFrames idênticos: colunas, dtypes, índice, ordem e valores exatos."""
+    if a is None or b is None:
+        return a is None and b is None
+    try:
+        pd.testing.assert_frame_equal(a, b, check_exact=True)
+    except AssertionError:
+        return False
+    return True
+
+
+# ── LIMPEZA ───────────────────────────────────────────────────────────────────
+
+
+def _limpar_valor(val):
+    """Converte valores monetários para float, tratando formatos BR e internacional."""
+    # Se já for numérico válido, retorna diretamente
+    if isinstance(val, (int, float)):
+        if pd.isna(val):
+            return 0.0
+        return float(val)
+
+    val = str(val).strip()
+    if not val or val.lower() == "nan":
+        return 0.0
+
+    if "R$" in val:
+        val = val.replace("R$", "").strip()
+
+    # Formato brasileiro: 1.234,56 (ponto como milhar, vírgula como decimal)
+    # Formato internacional: 1,234.56 (vírgula como milhar, ponto como decimal)
+    if val.count(".") >= 1 and val.count(",") == 1:
+        # Provavelmente formato brasileiro: 1.234,56
+        val = val.replace(".", "").replace(",", ".")
+    elif val.count(",") >= 1 and val.count(".") == 0:
+        # Só tem vírgula: 1234,56
+        val = val.replace(",", ".")
+
+    return pd.to_numeric(val, errors="coerce")
+
+
+def _limpar_total_parcelas(val):
+    """Extrai o total de parcelas. Ex: '01/10' -> 10, 12.0 -> 12."""
+    # Se já for numérico válido, retorna diretamente
+    try:
+        num_val = float(val)
+        if not pd.isna(num_val) and num_val >= 1 and float(num_val).is_integer():
+            return int(num_val)
+    except (ValueError, TypeError):
+        pass
+
+    s = str(val).strip()
+    if not s or s.lower() == "nan":
+        return 1
+
+    # Proteção contra Dinheiro: Se tiver vírgula e não for inteiro (ex: 12,50), rejeita.
+    s_clean = s.replace(",", ".")
+    try:
+        f_val = float(s_clean)
+        if f_val.is_integer() and f_val >= 1:
+            return int(f_val)
+        if not f_val.is_integer():
+            return 1  # É centavo (12.50), ignora
+    except ValueError:
+        pass
+
+    # Lógica da Barra: "01/10" ou "1 de 10"
+    numeros = re.findall(r"(\d+)", s)
+    if not numeros:
+        return 1
+
+    # Para o TOTAL, queremos o último número (o denominador)
+    return int(numeros[-1])
+
+
+def _limpar_parcela_atual(val):
+    """Extrai a parcela atual. Ex: '01/10' -> 1, 3.0 -> 3."""
+    # Se já for numérico válido, retorna diretamente
+    try:
+        num_val = float(val)
+        if not pd.isna(num_val) and num_val >= 1 and float(num_val).is_integer():
+            return int(num_val)
+    except (ValueError, TypeError):
+        pass
+
+    s = str(val).strip()
+    numeros = re.findall(r"(\d+)", s)
+    return int(numeros[0]) if numeros else 1
+
+
+# Formatos que o gerador não produz (CSVs editados à mão, outros bancos)
+BORDAS_VALORES = [
+    "R$ 1.234,56", "R$1.234,56", "1,234.56", "1234.56", "  12.5 ", "1.234.567",
+    "1,2,3", "", " ", "nan", "NaN", "abc", "R$", None, float("nan"), 12, -3.5,
+]
+BORDAS_PARCELAS = [
+    "01/10", "1/10", "3 de 12", " 2 ", "2.0", "2,00", "2,50", "", "nan",
+    "parcela", "inf", "3e0", None, float("nan"), 2.5, 0.0, -1, 1e-5,
+]
+
+
+def _corpus(brutos, colunas, bordas):
+    """Valores das colunas como foram lidos dos CSVs, mais os casos de borda."""
+    partes = [brutos[col].astype(object) for col in colunas]
+    return pd.concat([*partes, pd.Series(bordas, dtype=object)], ignore_index=True)
+
+
+def verificar_limpeza(brutos):
+    """Vetorizado × escalar nas colunas brutas dos CSVs. Retorna o nº de divergências."""
+    valores = _corpus(brutos, ["Valor_R$", "ValorTotal", "ValorAbsoluto"], BORDAS_VALORES)
+    parcelas = _corpus(brutos, ["ParcelaAtual", "TotalParcelas"], BORDAS_PARCELAS)
+    # Colunas já numéricas (CSV sem nenhum texto na coluna) seguem outro caminho
+    parcelas_float = pd.to_numeric(parcelas, errors="coerce").astype("float64")
+
+    casos = [
+        ("Valor_R$", valores, limpeza.limpar_valores,
+         lambda s: s.apply(_limpar_valor).fillna(0.0).astype("float64")),
+        ("ParcelaAtual", parcelas, limpeza.limpar_parcelas_atuais,
+         lambda s: s.apply(_limpar_parcela_atual).astype(int)),
+        ("TotalParcelas", parcelas, limpeza.limpar_totais_parcelas,
+         lambda s: s.apply(_limpar_total_parcelas).astype(int)),
+        ("ParcelaAtual (float64)", parcelas_float, limpeza.limpar_parcelas_atuais,
+         lambda s: s.apply(_limpar_parcela_atual).astype(int)),
+        ("TotalParcelas (float64)", parcelas_float, limpeza.limpar_totais_parcelas,
+         lambda s: s.apply(_limpar_total_parcelas).astype(int)),
+    ]
+
+    divergencias = 0
+    for nome, serie, vetorizado, escalar in casos:
+        t0 = time.perf_counter()
+        esperado = escalar(serie)
+        t1 = time.perf_counter()
+        obtido = vetorizado(serie)
+        t2 = time.perf_counter()
+
+        iguais = (obtido == esperado) | (obtido.isna() & esperado.isna())
+        n = int((~iguais).sum())
+        divergencias += n
+        print(
+            f"   {nome:<24} escalar {t1 - t0:>7.3f}s  vetorizado {t2 - t1:>7.3f}s  "
+            f"divergências: {n}"
+        )
+    return divergencias
+
+
+# ── ANOMALIAS ─────────────────────────────────────────────────────────────────
+
+
+def _detectar_referencia(df, mes_ref):
+    """Implementação original, com laços por estabelecimento e iterrows."""
+    meses_ordenados = sorted(df["MesAno"].unique())
+    if mes_ref not in meses_ordenados:
+        return {}
+
+    idx_atual = meses_ordenados.index(mes_ref)
+    meses_hist = meses_ordenados[max(0, idx_atual - 6):idx_atual]
+
+    df_mes = df[df["MesAno"] == mes_ref].copy()
+    df_hist = df[df["MesAno"].isin(meses_hist)].copy()
+
+    alertas = {"outliers": [], "assinaturas": [], "duplicatas": [], "sem_categoria": []}
+
+    for estab, grupo_mes in df_mes.groupby("Estabelecimento", observed=True):
+        hist = df_hist[df_hist["Estabelecimento"] == estab]["Valor_View"]
+        if len(hist) < 2:
+            continue
+        media = hist.mean()
+        atual = grupo_mes["Valor_View"].sum()
+        if media > 0 and atual > media * ALERTA_OUTLIER_FATOR:
+            alertas["outliers"].append({
+                "Estabelecimento": estab,
+                "Valor Atual (R$)": round(atual, 2),
+                "Média Histórica (R$)": round(media, 2),
+                "Vezes acima": round(atual / media, 1),
+            })
+
+    alertas["outliers"].sort(key=lambda x: x["Vezes acima"], reverse=True)
+
+    if len(meses_hist) >= 3:
+        estabs_hist = df_hist.groupby(["Estabelecimento", "MesAno"], observed=True)["Valor_View"].sum().reset_index()
+        recorrencia = estabs_hist.groupby("Estabelecimento", observed=True)["MesAno"].count()
+        recorrentes = recorrencia[recorrencia >= ALERTA_ASSINATURA_MIN_MESES].index
+
+        for estab in recorrentes:
+            if estab not in df_mes["Estabelecimento"].values:
+                continue
+            vals_hist = estabs_hist[estabs_hist["Estabelecimento"] == estab]["Valor_View"]
+            cv = vals_hist.std() / vals_hist.mean() if vals_hist.mean() > 0 else 1
+            if cv > ALERTA_ASSINATURA_MAX_CV:
+                continue
+            media_hist = vals_hist.mean()
+            val_atual = df_mes[df_mes["Estabelecimento"] == estab]["Valor_View"].sum()
+            variacao = (val_atual - media_hist) / media_hist if media_hist > 0 else 0
+            if abs(variacao) > ALERTA_ASSINATURA_VARIACAO:
+                alertas["assinaturas"].append({
+                    "Estabelecimento": estab,
+                    "Valor Atual (R$)": round(val_atual, 2),
+                    "Valor Habitual (R$)": round(media_hist, 2),
+                    "Variação (%)": round(variacao * 100, 1),
+                })
+
+    df_mes["Data_str"] = df_mes["Data"].dt.strftime("%Y-%m-%d")
+    grupo = df_mes.groupby(["Estabelecimento", "Valor_View", "Data_str"], observed=True).size().reset_index(name="n")
+    fortes = grupo[grupo["n"] > 1]
+    for _, row in fortes.iterrows():
+        alertas["duplicatas"].append({
+            "Estabelecimento": row["Estabelecimento"],
+            "Valor (R$)": round(row["Valor_View"], 2),
+            "Data": row["Data_str"],
+            "Ocorrências": int(row["n"]),
+            "Nível": "⚠️ Forte",
+        })
+
+    estabs_fortes = {(r["Estabelecimento"], r["Valor (R$)"]) for r in alertas["duplicatas"]}
+    grupo2 = df_mes.groupby(["Estabelecimento", "Valor_View"], observed=True).size().reset_index(name="n")
+    fracos = grupo2[grupo2["n"] > 1]
+    for _, row in fracos.iterrows():
+        chave = (row["Estabelecimento"], round(row["Valor_View"], 2))
+        if chave not in estabs_fortes:
+            alertas["duplicatas"].append({
+                "Estabelecimento": row["Estabelecimento"],
+                "Valor (R$)": round(row["Valor_View"], 2),
+                "Data": "datas distintas",
+                "Ocorrências": int(row["n"]),
+                "Nível": "ℹ️ Fraco",
+            })
+
+    sem_cat = df_mes[
+        (df_mes["Categoria"].str.strip().str.lower() == "diversos") &
+        (df_mes["Subcategoria"].str.strip().str.lower() == "diversos")
+    ][["Estabelecimento", "Valor_View", "Data"]].copy()
+    sem_cat["Data"] = sem_cat["Data"].dt.strftime("%d/%m/%Y")
+    sem_cat = sem_cat.rename(columns={"Valor_View": "Valor (R$)", "Data": "Data"})
+    alertas["sem_categoria"] = sem_cat.sort_values("Valor (R$)", ascending=False).to_dict("records")
+    return alertas
+
+
+
+def _alertas_iguais(esperado, obtido):
+    """Mesmos tipos de alerta e, em cada um, as mesmas linhas na mesma ordem, sem tolerância."""
+    if esperado.keys() != obtido.keys():
+        return False
+    return all(
+        _iguais(pd.DataFrame(esperado[tipo]), pd.DataFrame(obtido[tipo])) for tipo in esperado
+    )
+
+
+def verificar_anomalias(df, meses_teste, semente):
+    """Laços × vetorizado nos últimos meses. Retorna o nº de meses divergentes."""
+    # ~1% de cobranças em dobro: o gerador não produz duplicatas
+    df = particao.ordenar_por_mes(
+        pd.concat([df, df.sample(frac=0.01, random_state=semente)], ignore_index=True)
+    )
+    t0 = time.perf_counter()
+    cubo = agregados.construir_cubo(df, ["mes"])
+    indice = particao.indexar_meses(df)
+    print(f"   cubo + índice em {time.perf_counter() - t0:.3f}s")
+
+    divergencias = 0
+    t_ref = t_vet = 0.0
+    alertas = dict.fromkeys(["outliers", "assinaturas", "duplicatas", "sem_categoria"], 0)
+    meses = list(indice)[-meses_teste:]
+    for mes in meses:
+        t0 = time.perf_counter()
+        esperado = _detectar_referencia(df, mes)
+        t1 = time.perf_counter()
+        obtido = nucleo.detectar_anomalias(df, mes, cubo=cubo, indice=indice)
+        t2 = time.perf_counter()
+        t_ref += t1 - t0
+        t_vet += t2 - t1
+        for tipo in alertas:
+            alertas[tipo] += len(esperado.get(tipo, []))
+        if not _alertas_iguais(esperado, obtido):
+            divergencias += 1
+            print(f"   ✗ {mes}: resultado diferente")
+
+    print(
+        f"   {len(meses)} meses · laços {t_ref:.3f}s  vetorizado {t_vet:.3f}s  "
+        f"({t_ref / t_vet:.0f}× mais rápido)"
+    )
+    print("   alertas conferidos: " + " · ".join(f"{tipo} {n}" for tipo, n in alertas.items()))
+    return divergencias
+
+
+# ── PROJEÇÃO ──────────────────────────────────────────────────────────────────
+
+
+def _projetar_referencia(df_mes):
+    """Implementação original, com apply de DateOffset e iterrows."""
+    if df_mes.empty:
+        return None, None
+
+    ativos = df_mes[
+        (df_mes["TotalParcelas"] > 1)
+        & (df_mes["ParcelaAtual"] < df_mes["TotalParcelas"])
+        & (df_mes["EhParcela"] == 1)
+    ].copy()
+
+    if ativos.empty:
+        return None, None
+
+    data_base = _data_base(df_mes)
+
+    ativos["Valor_Total_Compra"] = ativos["Valor_View"] * ativos["TotalParcelas"]
+    ativos["Meses_Restantes"] = ativos["TotalParcelas"] - ativos["ParcelaAtual"]
+
+    ativos["Data_Final"] = ativos.apply(
+        lambda x: data_base + pd.DateOffset(months=int(x["Meses_Restantes"])), axis=1
+    )
+    ativos["Ultima_Parcela_Fmt"] = ativos["Data_Final"].dt.strftime("%m/%Y")
+
+    df_tabela = ativos[COLUNAS_TABELA].sort_values(
+        by=["Data_Final", "Valor_View"], ascending=[False, False]
+    )
+
+    projecao = []
+    for _, row in ativos.iterrows():
+        faltam = int(row["Meses_Restantes"])
+        for i in range(1, faltam + 1):
+            data_futura = data_base + pd.DateOffset(months=i)
+            projecao.append(
+                {
+                    "Mes_Sort": data_futura.strftime("%Y-%m"),
+                    "Mês Referência": data_futura.strftime("%m/%Y"),
+                    "Valor": row["Valor_View"],
+                    "Estabelecimento": row["Estabelecimento"],
+                }
+            )
+
+    if projecao:
+        df_grafico = (
+            pd.DataFrame(projecao)
+            .groupby(CHAVES_GRAFICO, observed=True)["Valor"]
+            .sum()
+            .reset_index()
+            .sort_values("Mes_Sort")
+        )
+    else:
+        df_grafico = pd.DataFrame()
+
+    return df_tabela, df_grafico
+
+
+
+
+def verificar_projecao(df, meses_teste):
+    """Original × vetorizado nos últimos meses. Retorna o nº de divergências."""
+    indice = particao.indexar_meses(df)
+    casos = [(mes, particao.fatiar(df, indice, mes)) for mes in list(indice)[-meses_teste:]]
+    casos.append(("(vazio)", df.iloc[:0]))
+
+    divergencias = 0
+    t_ref = t_vet = 0.0
+    for mes, df_mes in casos:
+        t0 = time.perf_counter()
+        esperado = _projetar_referencia(df_mes)
+        t1 = time.perf_counter()
+        obtido = projecao.projetar(df_mes)
+        t2 = time.perf_counter()
+        t_ref += t1 - t0
+        t_vet += t2 - t1
+        if not all(_iguais(a, b) for a, b in zip(esperado, obtido)):
+            divergencias += 1
+            print(f"   ✗ {mes}: resultado diferente")
+    print(f"   {len(casos)} meses · original {t_ref:.3f}s  vetorizado {t_vet:.3f}s")
+
+    # Data base fora do dia 1 (fallback sem MesAno): DateOffset limita ao fim do mês
+    for base in ["2024-01-31", "2023-08-30", "2024-02-29"]:
+        base = pd.Timestamp(base)
+        meses = np.arange(0, 61)
+        esperado = pd.DatetimeIndex([base + pd.DateOffset(months=int(m)) for m in meses])
+        iguais = (pd.DatetimeIndex(projecao._somar_meses(base, meses)) == esperado).all()
+        divergencias += not iguais
+        print(f"   DateOffset a partir de {base.date()}  {'✓' if iguais else '✗'}")
+    return divergencias
+
+
+# ── CLASSIFICADOR ─────────────────────────────────────────────────────────────
+
+
+def _classificar_linear(estabelecimento: str, regras: list) -> tuple:
+    """Versão original do classificar: varredura de todas as regras para cada nome."""
+    nome_lower = estabelecimento.lower()
+
+    for regra in regras:
+        if regra["palavra_chave"] in nome_lower:
+            return regra["palavra_chave"].title(), regra["categoria"], regra["subcategoria"], 1
+
+    palavras = [p for p in re.split(r"[\s\*\.\-\/]+", nome_lower) if len(p) >= 5]
+    for palavra in palavras:
+        for regra in regras:
+            if palavra in regra["palavra_chave"]:
+                return regra["palavra_chave"].title(), regra["categoria"], regra["subcategoria"], 2
+
+    return estabelecimento, "", "", 3
+
+
+def verificar_classificador(n_regras, n_nomes, semente):
+    """Autômato + n-gramas × varredura linear nos nomes do gerador. Retorna o nº de divergências."""
+    regras, nomes = benchmark.gerar_regras_e_nomes(n_regras, n_nomes, semente)
+    t0 = time.perf_counter()
+    compiladas = parse_pdf.compilar_regras(regras)
+    obtidos = [parse_pdf.classificar(nome, compiladas) for nome in nomes]
+    t1 = time.perf_counter()
+    esperados = [_classificar_linear(nome, regras) for nome in nomes]
+    t2 = time.perf_counter()
+
+    divergencias = sum(a != b for a, b in zip(esperados, obtidos))
+    niveis = " · ".join(
+        f"nível {n} {sum(1 for r in esperados if r[3] == n)}" for n in (1, 2, 3)
+    )
+    print(
+        f"   {n_regras:,} regras × {n_nomes:,} nomes  linear {t2 - t1:.3f}s  "
+        f"compilado {t1 - t0:.3f}s  divergências: {divergencias}"
+    )
+    print(f"   classificações conferidas: {niveis}")
+    return divergencias
+
+
+# ── EXTRAÇÃO (cliente falso) ──────────────────────────────────────────────────
+
+# Nomes que atravessam aspas, barras, escapes, chaves e colchetes dentro das strings
+NOMES_DIFICEIS = [
+    'PADARIA "PÃO QUENTE"', "LOJA C:\\TEMP\\", "CAFÉ {ÇA} [1], 2", "PIZZA 🍕 DELIVERY",
+    "UBER *TRIP 03/10", "TAB\tE\nQUEBRA", 'ASPAS \\" E BARRA', 'FIM}]"', "MERCADO LIVRE",
+]
+REGRAS_FALSAS = "palavra_chave;categoria;subcategoria\npadaria;Alimentação;Padaria\nuber;Transporte;Aplicativo\npizza;Alimentação;Delivery\n"
+
+
+class _ClienteFalso:
+    """
+    Imita o genai.Client (files.upload, models.generate_content e
+    generate_content_stream) sem rede. roteiros: nome do PDF → uma entrada por
+    chamada, repetindo a última: texto da resposta ou exceção a levantar (no
+    stream, lista de pedaços). Conta chamadas e o máximo de gerações em voo.
+    """
+
+    def __init__(self, roteiros, demora=0.0):
+        self.roteiros = roteiros
+        self.demora = demora
+        self.chamadas = {nome: 0 for nome in roteiros}
+        self.em_voo = 0
+        self.max_em_voo = 0
+        self._trava = threading.Lock()
+        self.files = SimpleNamespace(upload=self._upload)
+        self.models = SimpleNamespace(
+            generate_content=self._gerar, generate_content_stream=self._gerar_stream
+        )
+
+    def _upload(self, file, config):
+        file.read()
+        return config["display_name"]
+
+    def _roteiro(self, nome):
+        with self._trava:
+            n = self.chamadas[nome]
+            self.chamadas[nome] += 1
+        roteiro = self.roteiros[nome]
+        return roteiro[min(n, len(roteiro) - 1)]
+
+    def _gerar(self, model, contents):
+        with self._trava:
+            self.em_voo += 1
+            self.max_em_voo = max(self.max_em_voo, self.em_voo)
+        try:
+            time.sleep(self.demora)
+            resposta = self._roteiro(contents[0])
+            if isinstance(resposta, Exception):
+                raise resposta
+            return SimpleNamespace(text=resposta)
+        finally:
+            with self._trava:
+                self.em_voo -= 1
+
+    def _gerar_stream(self, model, contents):
+        for pedaco in self._roteiro(contents[0]):
+            if isinstance(pedaco, Exception):
+                raise pedaco
+            yield SimpleNamespace(text=pedaco)
+
+
+def _fatura_falsa(rng, mes_ano, n):
+    """JSON no formato do PROMPT_BASE, com os NOMES_DIFICEIS e valores variados."""
+    ano, mes = map(int, mes_ano.split("-"))
+    transacoes = []
+    for i in range(n):
+        total = int(rng.choice([1, 1, 1, 3, 10]))
+        valor = float(rng.choice([round(rng.uniform(-80, 900), 2), 100, 0.1, -12.5]))
+        transacoes.append({
+            "data": f"{ano}-{mes:02d}-{i % 28 + 1:02d}",
+            "estabelecimento": NOMES_DIFICEIS[i % len(NOMES_DIFICEIS)],
+            "valor_brl": valor,
+            "cartao_final": str(rng.choice(["2404", "4324", "8821"])),
+            "parcela_atual": min(total, i % 3 + 1),
+            "total_parcelas": total,
+            "eh_estorno": valor < 0,
+            "categoria_sugerida": "Diversos",
+            "subcategoria_sugerida": "Diversos",
+        })
+    total_fatura = round(sum(tx["valor_brl"] for tx in transacoes), 2)
+    return {"total_fatura": total_fatura, "mes_ano": mes_ano, "transacoes": transacoes}
+
+
+def _conferir(falhas, condicao, descricao):
+    if not condicao:
+        falhas.append(descricao)
+
+
+def verificar_lote(semente):
+    """
+    executar_lote com cliente falso: limite de PDFs em voo, nova tentativa após
+    erro transitório, PDF que falha em todas, _raw.json e tabela do resumo, e a
+    segunda rodada saindo do cache. Retorna o nº de verificações que falharam.
+    """
+    rng = np.random.default_rng(semente)
+    paralelo, tentativas = 3, 3
+    falhas = []
+    with tempfile.TemporaryDirectory(prefix="paridade_lote_") as diretorio:
+        raiz = Path(diretorio)
+        (raiz / "data").mkdir()
+        (raiz / "data" / "regras.csv").write_text(REGRAS_FALSAS, encoding="utf-8")
+        (raiz / "faturas").mkdir()
+        pdfs, roteiros, esperados = [], {}, {}
+        # Dois PDFs no mesmo mês (cartões diferentes): rótulo YYYYMM_nome
+        for i, mes_ano in enumerate(["2024-01", "2024-02", "2024-03", "2024-03", "2024-04",
+                                     "2024-05", "2024-06", "2024-07"]):
+            pdf = raiz / "faturas" / f"fatura_{i}.pdf"
+            pdf.write_bytes(f"%PDF-1.4 falso {i}".encode())
+            pdfs.append(pdf)
+            esperados[pdf.name] = _fatura_falsa(rng, mes_ano, 5 + i)
+            roteiros[pdf.name] = [json.dumps(esperados[pdf.name], ensure_ascii=False)]
+        transitorio, permanente = pdfs[1].name, pdfs[5].name
+        roteiros[transitorio].insert(0, ConnectionError("503 UNAVAILABLE (transitório)"))
+        roteiros[permanente] = ["Desculpe, não consegui ler esta fatura."]
+
+        cliente = _ClienteFalso(roteiros, demora=0.05)
+        saida = io.StringIO()
+        with redirect_stdout(saida):
+            resultados = parse_pdf.executar_lote(
+                pdfs, cliente, raiz, paralelo=paralelo, tentativas=tentativas, espera=0
+            )
+        regras = parse_pdf.carregar_regras(raiz / "data" / "regras.csv")
+        tabela = saida.getvalue().split("📋 Lote")[1].splitlines()
+
+        _conferir(falhas, cliente.max_em_voo == paralelo,
+                  f"{cliente.max_em_voo} PDFs em voo ao mesmo tempo (limite {paralelo})")
+        _conferir(falhas, [r["pdf"] for r in resultados] == pdfs, "resultados fora da ordem dos PDFs")
+        for pdf, r in zip(pdfs, resultados):
+            chamadas = {transitorio: 2, permanente: tentativas}.get(pdf.name, 1)
+            _conferir(falhas, cliente.chamadas[pdf.name] == chamadas == r["tentativas"],
+                      f"{pdf.name}: {cliente.chamadas[pdf.name]} chamadas, {r['tentativas']} tentativas")
+            linha = [l for l in tabela if l.strip().startswith(pdf.name)]
+            if pdf.name == permanente:
+                _conferir(falhas, r["dados"] is None and r["erro"].startswith("ErroExtracao"),
+                          f"{pdf.name}: falha permanente não registrada ({r['erro']})")
+                mes = esperados[pdf.name]["mes_ano"].replace("-", "")
+                _conferir(falhas, not (raiz / "data" / "raw" / f"{mes}_raw.json").exists(),
+                          f"{pdf.name}: _raw.json gravado para PDF que falhou")
+                _conferir(falhas, len(linha) == 1 and "✗ ErroExtracao" in linha[0],
+                          f"{pdf.name}: linha de falha ausente no resumo")
+                continue
+            dados = esperados[pdf.name]
+            mes = dados["mes_ano"].replace("-", "")
+            rotulo = f"{mes}_{pdf.stem}" if mes == "202403" else mes
+            gravado = raiz / "data" / "raw" / f"{rotulo}_raw.json"
+            _conferir(falhas, r["rotulo"] == rotulo and gravado.exists()
+                      and json.loads(gravado.read_text()) == dados,
+                      f"{pdf.name}: {gravado.name} ausente ou diferente da resposta")
+            inferidos = len(parse_pdf.processar(dados, regras, dados["mes_ano"])[1])
+            colunas = linha[0].split() if len(linha) == 1 else []
+            _conferir(falhas, colunas[1:5] + colunas[6:] == [
+                gravado.name, str(len(dados["transacoes"])), str(inferidos), str(r["tentativas"]), "API"
+            ], f"{pdf.name}: linha do resumo {colunas}")
+        _conferir(falhas, f"{len(pdfs) - 1}/{len(pdfs)} extraídos" in saida.getvalue(),
+                  "total de extraídos ausente do resumo")
+
+        # Segunda rodada: só o PDF que falhou volta à API, o resto sai do cache
+        antes = dict(cliente.chamadas)
+        with redirect_stdout(io.StringIO()):
+            resultados = parse_pdf.executar_lote(
+                pdfs, cliente, raiz, paralelo=paralelo, tentativas=tentativas, espera=0
+            )
+        novas = {nome: cliente.chamadas[nome] - antes[nome] for nome in antes}
+        _conferir(falhas, novas == {nome: tentativas if nome == permanente else 0 for nome in novas},
+                  f"segunda rodada chamou a API: {novas}")
+        _conferir(falhas, all(r["cache"] for r in resultados if r["pdf"].name != permanente),
+                  "segunda rodada não veio do cache")
+
+    print(
+        f"   {len(pdfs)} PDFs, {paralelo} por vez: máx. {cliente.max_em_voo} em voo · "
+        f"{sum(antes.values())} chamadas (1 erro transitório, 1 PDF sem JSON) · "
+        f"2ª rodada: {sum(novas.values())} chamadas"
+    )
+    for falha in falhas:
+        print(f"   ✗ {falha}")
+    return len(falhas)
+
+
+def _resposta_stream(rng, n):
+    """
+    Texto de resposta (com cercas de markdown) de uma fatura falsa de n
+    transações, o json.loads do corpo e, para cada transação, a posição do
+    texto logo depois do "}" que a fecha. Metade das transações vem com escapes
+    Unicode (ensure_ascii), metade com os caracteres crus.
+    """
+    dados = _fatura_falsa(rng, "2024-03", n)
+    texto = '```json\n{"total_fatura": ' + json.dumps(dados["total_fatura"])
+    texto += ', "mes_ano": "2024-03",\n  "transacoes": [\n    '
+    fins = []
+    for i, tx in enumerate(dados["transacoes"]):
+        if i:
+            texto += ",\n    "
+        texto += json.dumps(tx, ensure_ascii=i % 2 == 0)
+        fins.append(len(texto))
+    texto += '\n  ],\n  "banco": "Itaú \\"Personnalité\\" {}[]"\n}\n```'
+    return texto, json.loads(texto[len("```json\n"):-len("\n```")]), fins
+
+
+def _pedacos(texto, cortes):
+    cortes = sorted(set(cortes))
+    return [texto[a:b] for a, b in zip([0] + cortes, cortes + [len(texto)])]
+
+
+def _ler_pedacos(pedacos):
+    leitor = parse_pdf.LeitorTransacoes()
+    emitidas = [tx for pedaco in pedacos for tx in leitor.alimentar(pedaco)]
+    emitidas += leitor.alimentar("", fim=True)
+    return leitor, emitidas
+
+
+def _extrair_stream(pdf, pedacos, checkpoint, cache_dir=None):
+    """(transações emitidas, erro ou None, chamadas à API) de extrair_stream com um stream falso."""
+    cliente = _ClienteFalso({pdf.name: [pedacos]})
+    leitor = parse_pdf.LeitorTransacoes()
+    emitidas, erro = [], None
+    try:
+        for tx in parse_pdf.extrair_stream(cliente, pdf, "prompt", leitor, checkpoint, cache_dir):
+            emitidas.append(tx)
+    except parse_pdf.ErroExtracao as e:
+        erro = e
+    return emitidas, erro, cliente.chamadas[pdf.name]
+
+
+def verificar_stream(semente):
+    """
+    LeitorTransacoes e extrair_stream com stream falso: a saída tem de ser o
+    json.loads da resposta inteira, qualquer que seja o corte em pedaços
+    (inclusive no meio de strings, escapes e números). Resposta truncada em
+    cada posição: ErroExtracao, checkpoint com as transações completas até ali
+    e nova extração que termina e apaga o checkpoint. JSON inválido: o mesmo
+    veredito do json.loads. Retorna o nº de verificações que falharam.
+    """
+    rng = np.random.default_rng(semente)
+    texto, esperado, fins = _resposta_stream(rng, 12)
+    transacoes = esperado["transacoes"]
+    falhas = []
+
+    # Cortes: um em cada posição, pedaços de tamanho fixo e cortes aleatórios
+    cortes = [[k] for k in range(1, len(texto))]
+    cortes += [list(range(t, len(texto), t)) for t in range(1, 17)]
+    cortes += [list(rng.integers(1, len(texto), int(rng.integers(2, 60)))) for _ in range(300)]
+    for c in cortes:
+        leitor, emitidas = _ler_pedacos(_pedacos(texto, c))
+        if not (leitor.completo and leitor.dados() == esperado and emitidas == transacoes):
+            falhas.append(f"cortes {sorted(c)[:5]}…: saída diferente do json.loads")
+            break
+
+    with tempfile.TemporaryDirectory(prefix="paridade_stream_") as diretorio:
+        raiz = Path(diretorio)
+        pdf = raiz / "fatura.pdf"
+        pdf.write_bytes(b"%PDF-1.4 falso")
+        raw = raiz / "data" / "raw"
+        raw.mkdir(parents=True)
+        checkpoint = raw / f"{pdf.stem}_parcial_raw.json"
+        cache_dir = raiz / "data" / parse_pdf.DIR_CACHE_GEMINI
+        regras = parse_pdf.compilar_regras([])
+
+        emitidas, erro, _ = _extrair_stream(pdf, _pedacos(texto, range(7, len(texto), 7)), checkpoint, cache_dir)
+        _conferir(falhas, erro is None and emitidas == transacoes and not checkpoint.exists(),
+                  f"stream completo: {erro or 'saída diferente do json.loads ou checkpoint não apagado'}")
+        emitidas, erro, chamadas = _extrair_stream(pdf, [], checkpoint, cache_dir)
+        _conferir(falhas, erro is None and emitidas == transacoes and chamadas == 0,
+                  "resposta em cache não voltou igual sem chamar a API")
+
+        # Truncada em cada posição até o "}" final, em pedaços de 7
+        fim = texto.rindex("}") + 1
+        for k in range(fim):
+            checkpoint.unlink(missing_ok=True)
+            emitidas, erro, _ = _extrair_stream(pdf, _pedacos(texto[:k], range(7, k, 7)), checkpoint)
+            completas = sum(f <= k for f in fins)
+            salvas = json.loads(checkpoint.read_text()) if checkpoint.exists() else {"transacoes": []}
+            if not (erro is not None and emitidas == salvas["transacoes"] == transacoes[:completas]
+                    and salvas.get("parcial", completas == 0)):
+                falhas.append(f"truncada na posição {k}: {completas} transações esperadas no checkpoint")
+                break
+            if k == fins[len(fins) // 2]:
+                # Retomada pelo --reclassify <pdf>_parcial: mesmas linhas das transações que chegaram
+                parciais = parse_pdf.processar(salvas, regras, "2024-03")[0]
+                inteiras = parse_pdf.processar({"transacoes": transacoes[:completas]}, regras, "2024-03")[0]
+                _conferir(falhas, parciais == inteiras, f"checkpoint da posição {k} reclassifica diferente")
+        _conferir(falhas, checkpoint.exists(), "checkpoint da resposta truncada não ficou em data/raw/")
+        emitidas, erro, _ = _extrair_stream(pdf, _pedacos(texto, range(5, len(texto), 5)), checkpoint)
+        _conferir(falhas, erro is None and emitidas == transacoes and not checkpoint.exists(),
+                  "nova extração depois da truncada não terminou ou não apagou o checkpoint")
+
+        # JSON inválido: (descrição, texto, transações completas antes do defeito)
+        meio = fins[5]
+        invalidos = [
+            ("vírgula faltando", texto[:meio] + texto[meio + 1:], 6),
+            ("vírgula dupla", texto[:meio] + "," + texto[meio:], 6),
+            ("vírgula antes do ]", texto[:fins[-1]] + "," + texto[fins[-1]:], len(fins)),
+            ("vírgula antes do }", texto[:fim - 2] + "," + texto[fim - 2:], len(fins)),
+            ("número inválido", texto[:meio] + texto[meio:].replace('"valor_brl": ', '"valor_brl": +', 1), 6),
+            ("chave sem aspas", texto.replace('"mes_ano"', "mes_ano", 1), 0),
+            ("chave numérica", texto.replace("{", "{1: 0, ", 1), 0),
+            ("dois-pontos faltando", texto.replace('"mes_ano":', '"mes_ano"', 1), 0),
+        ]
+        for descricao, corrompido, antes in invalidos:
+            try:
+                parse_pdf.interpretar_resposta(corrompido)
+                falhas.append(f"{descricao}: json.loads aceitou o texto do teste")
+                continue
+            except parse_pdf.ErroExtracao:
+                pass
+            checkpoint.unlink(missing_ok=True)
+            emitidas, erro, _ = _extrair_stream(pdf, _pedacos(corrompido, range(3, len(corrompido), 3)), checkpoint)
+            _conferir(falhas, erro is not None and emitidas == transacoes[:antes],
+                      f"{descricao}: {'aceito' if erro is None else f'{len(emitidas)} transações emitidas'}")
+
+    print(
+        f"   {len(texto):,} caracteres, {len(transacoes)} transações: {len(cortes):,} cortes em pedaços · "
+        f"truncada em {fim:,} posições · {len(invalidos)} JSONs inválidos"
+    )
+    for falha in falhas:
+        print(f"   ✗ {falha}")
+    return len(falhas)
+
+
+# ── MAIN ──────────────────────────────────────────────────────────────────────
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Confere os motores vetorizados contra as implementações originais."
+    )
+    parser.add_argument("--anos", type=int, default=5, help="Anos de faturas sintéticas")
+    parser.add_argument("--transacoes", type=int, default=300, help="Compras novas por mês")
+    parser.add_argument("--meses", type=int, default=12, help="Meses avaliados em cada verificação")
+    parser.add_argument("--regras", type=int, default=2000, help="Regras do classificador")
+    parser.add_argument("--estabelecimentos", type=int, default=20_000, help="Nomes classificados")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--so", choices=ETAPAS, help="Roda só uma das verificações")
+    args = parser.parse_args()
+    etapas = [args.so] if args.so else ETAPAS
+
+    if ETAPAS_FATURAS.intersection(etapas):
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory(prefix="paridade_") as diretorio:
+            os.chdir(diretorio)
+            try:
+                print(f"🧾 Gerando e ingerindo {args.anos} anos de faturas sintéticas...")
+                brutos, df = preparar(diretorio, args.anos, args.transacoes, args.semente)
+            finally:
+                os.chdir(cwd)
+        print(f"   {len(brutos):,} linhas nos CSVs · {len(df):,} transações no dataset")
+
+    divergencias = 0
+    if "limpeza" in etapas:
+        print("🔬 Limpeza: escalar × vetorizado (colunas brutas + casos de borda)")
+        divergencias += verificar_limpeza(brutos)
+    if "anomalias" in etapas:
+        print(f"🔬 Anomalias: laços × vetorizado (últimos {args.meses} meses)")
+        divergencias += verificar_anomalias(df, args.meses, args.semente)
+    if "projecao" in etapas:
+        print(f"🔬 Projeção de parcelas: original × vetorizado (últimos {args.meses} meses)")
+        divergencias += verificar_projecao(df, args.meses)
+    if "classificador" in etapas:
+        print("🔬 Classificador do parse_pdf.py: varredura linear × autômato + n-gramas")
+        divergencias += verificar_classificador(args.regras, args.estabelecimentos, args.semente)
+    if "lote" in etapas:
+        print("🔬 Lote do parse_pdf.py com cliente falso: concorrência, novas tentativas e resumo")
+        divergencias += verificar_lote(args.semente)
+    if "stream" in etapas:
+        print("🔬 Streaming do parse_pdf.py com stream falso × json.loads da resposta inteira")
+        divergencias += verificar_stream(args.semente)
+
+    if divergencias:
+        print("✗ Há divergências.")
+        raise SystemExit(1)
+    print("✓ Resultados idênticos.")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,23 +6,24 @@ Uso:
     python parse_pdf.py fatura.pdf              # extrai via API e mostra inferidos
     python parse_pdf.py --reclassify 202602     # reclassifica e gera CSV
     python parse_pdf.py --reclassify 202602 --mes-ano 2026-02  # força mês/ano
+    python parse_pdf.py --batch faturas/        # extrai todos os PDFs da pasta em paralelo
+    python parse_pdf.py fatura.pdf --refresh    # ignora a resposta guardada e chama a API
+    python parse_pdf.py fatura.pdf --stream     # classifica as transações enquanto chegam
 """
 
 import argparse
 import csv
+import gzip
 import hashlib
 import json
 import os
 import re
 import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
-try:
-    from google import genai
-    from google.genai import types as genai_types
-except ImportError:
-    print("Erro: instale o pacote com: pip install google-genai")
-    sys.exit(1)
 
 # Carrega .env se existir
 _env_path = Path(__file__).parent / ".env"
@@ -44,6 +45,16 @@ CARD_MAP = {
     "6090": "Rico-JP",
 }
 
+MODELO_GEMINI = "gemini-2.5-flash"
+
+# Respostas do Gemini guardadas por (PDF, prompt, modelo), em data/
+DIR_CACHE_GEMINI = "cache_gemini"
+
+# Modo --batch: PDFs em voo ao mesmo tempo e novas tentativas por arquivo
+LOTE_PARALELO = 4
+LOTE_TENTATIVAS = 3
+LOTE_ESPERA_SEGUNDOS = 2.0  # dobra a cada nova tentativa
+
 COLUNAS_CSV = [
     "TxID", "Data", "MesAno", "Estabelecimento", "Categoria", "Subcategoria",
     "Valor_R$", "Cartao", "Observacao", "EhParcela", "ParcelaAtual",
@@ -115,7 +126,8 @@ def gerar_txid(data: str, estab: str, valor: float, cartao: str) -> str:
     return hashlib.md5(base.encode("utf-8")).hexdigest()
 
 
-def carregar_regras(path: Path) -> list:
+def carregar_regras(path: Path) -> dict:
+    """Lê o regras.csv e devolve as regras já compiladas para o classificar (ver compilar_regras)."""
     regras = []
     with open(path, encoding="utf-8") as f:
         for row in csv.DictReader(f, delimiter=";"):
@@ -126,73 +138,648 @@ def carregar_regras(path: Path) -> list:
             })
     # Mais específico (mais longo) primeiro para evitar match genérico antes do específico
     regras.sort(key=lambda r: len(r["palavra_chave"]), reverse=True)
-    return regras
+    compiladas = compilar_regras(regras)
+    # Hash do conteúdo: o memo de classificações só vale para este regras.csv
+    compiladas["versao"] = hashlib.sha256(path.read_bytes()).hexdigest()
+    return compiladas
+
+
+# ── CLASSIFICAÇÃO ─────────────────────────────────────────────────────────────
 
+SEPARADORES_PALAVRA = re.compile(r"[\s\*\.\-\/]+")
+TAMANHO_MIN_PALAVRA = 5  # nível 2: palavras menores geram falsos positivos
+_SEM_REGRA = float("inf")
 
-def classificar(estabelecimento: str, regras: list) -> tuple:
+
+def _construir_automato(palavras_chave: list) -> tuple:
+    """
+    Aho-Corasick das palavras-chave. Retorna (transicoes, falha, melhor):
+    melhor[estado] é o menor índice de regra entre as palavras-chave que terminam
+    no estado ou em algum sufixo dele (cadeia de falhas).
+    """
+    transicoes = [{}]
+    melhor = [_SEM_REGRA]
+    for indice, chave in enumerate(palavras_chave):
+        estado = 0
+        for ch in chave:
+            proximo = transicoes[estado].get(ch)
+            if proximo is None:
+                proximo = len(transicoes)
+                transicoes[estado][ch] = proximo
+                transicoes.append({})
+                melhor.append(_SEM_REGRA)
+            estado = proximo
+        melhor[estado] = min(melhor[estado], indice)
+
+    falha = [0] * len(transicoes)
+    fila = deque(transicoes[0].values())
+    while fila:
+        estado = fila.popleft()
+        for ch, filho in transicoes[estado].items():
+            f = falha[estado]
+            while f and ch not in transicoes[f]:
+                f = falha[f]
+            destino = transicoes[f].get(ch, 0)
+            falha[filho] = destino if destino != filho else 0
+            melhor[filho] = min(melhor[filho], melhor[falha[filho]])
+            fila.append(filho)
+    return transicoes, falha, melhor
+
+
+def _construir_indice_ngramas(palavras_chave: list) -> dict:
+    """n-grama (TAMANHO_MIN_PALAVRA caracteres) → índices, em ordem, das regras que o contêm."""
+    n = TAMANHO_MIN_PALAVRA
+    indice = {}
+    for i, chave in enumerate(palavras_chave):
+        for inicio in range(len(chave) - n + 1):
+            lista = indice.setdefault(chave[inicio:inicio + n], [])
+            if not lista or lista[-1] != i:
+                lista.append(i)
+    return indice
+
+
+def compilar_regras(regras: list) -> dict:
+    """
+    Prepara regras (já na ordem de prioridade) para o classificar.
+
+    Nível 1 vira um autômato Aho-Corasick: uma passada pelo nome encontra todas
+    as palavras-chave contidas nele e fica com a de maior prioridade, como a
+    varredura linear faria. Nível 2 usa um índice invertido de n-gramas: só as
+    regras que contêm um n-grama da palavra são testadas, em ordem de prioridade.
+    """
+    palavras_chave = [r["palavra_chave"] for r in regras]
+    transicoes, falha, melhor = _construir_automato(palavras_chave)
+    # Palavra-chave vazia é substring de qualquer nome (a raiz do autômato)
+    melhor[0] = min(melhor[0], min((i for i, c in enumerate(palavras_chave) if not c), default=_SEM_REGRA))
+    return {
+        "regras": regras,
+        "transicoes": transicoes,
+        "falha": falha,
+        "melhor": melhor,
+        "ngramas": _construir_indice_ngramas(palavras_chave),
+    }
+
+
+def _nivel_1(nome_lower: str, compiladas: dict):
+    transicoes, falha, melhor = compiladas["transicoes"], compiladas["falha"], compiladas["melhor"]
+    estado = 0
+    achada = melhor[0]
+    for ch in nome_lower:
+        while estado and ch not in transicoes[estado]:
+            estado = falha[estado]
+        estado = transicoes[estado].get(ch, 0)
+        if melhor[estado] < achada:
+            achada = melhor[estado]
+    return achada
+
+
+def _nivel_2(palavra: str, compiladas: dict):
+    n = TAMANHO_MIN_PALAVRA
+    ngramas = compiladas["ngramas"]
+    # Toda regra que contém a palavra contém cada n-grama dela: basta a menor lista
+    candidatas = min(
+        (ngramas.get(palavra[i:i + n], ()) for i in range(len(palavra) - n + 1)), key=len
+    )
+    regras = compiladas["regras"]
+    for i in candidatas:
+        if palavra in regras[i]["palavra_chave"]:
+            return i
+    return None
+
+
+def _resultado(regra: dict, nivel: int) -> tuple:
+    return regra["palavra_chave"].title(), regra["categoria"], regra["subcategoria"], nivel
+
+
+def classificar(estabelecimento: str, regras: dict) -> tuple:
     """
     Matching em 3 níveis:
       1 — Direto:     keyword é substring do nome do estabelecimento
       2 — Por palavra: palavra do estabelecimento (≥5 chars) é substring de alguma keyword
       3 — Inferido:   nenhum match encontrado
 
+    regras vem de carregar_regras/compilar_regras. Mesmo resultado da varredura
+    linear de todas as regras (conferido por paridade.py), com custo proporcional
+    ao tamanho do nome.
+
     Retorna (nome_padronizado, categoria, subcategoria, nivel)
     """
     nome_lower = estabelecimento.lower()
 
     # Nível 1: match direto
-    for regra in regras:
-        if regra["palavra_chave"] in nome_lower:
-            return regra["palavra_chave"].title(), regra["categoria"], regra["subcategoria"], 1
+    achada = _nivel_1(nome_lower, regras)
+    if achada != _SEM_REGRA:
+        return _resultado(regras["regras"][achada], 1)
 
     # Nível 2: match por palavra (palavras ≥5 chars para evitar falsos positivos)
-    palavras = [p for p in re.split(r"[\s\*\.\-\/]+", nome_lower) if len(p) >= 5]
+    palavras = [p for p in SEPARADORES_PALAVRA.split(nome_lower) if len(p) >= TAMANHO_MIN_PALAVRA]
     for palavra in palavras:
-        for regra in regras:
-            if palavra in regra["palavra_chave"]:
-                return regra["palavra_chave"].title(), regra["categoria"], regra["subcategoria"], 2
+        achada = _nivel_2(palavra, regras)
+        if achada is not None:
+            return _resultado(regras["regras"][achada], 2)
 
     # Nível 3: inferido
     return estabelecimento, "", "", 3
 
 
-def extrair_via_gemini(pdf_path: Path, api_key: str, regras_path: Path) -> dict:
-    client = genai.Client(api_key=api_key)
-    prompt = _build_prompt(regras_path)
+# ── MEMO DE CLASSIFICAÇÕES ────────────────────────────────────────────────────
+
+ARQUIVO_MEMO = "classificacoes.json"  # em data/, ao lado do regras.csv
+VERSAO_MEMO = 1
+
+
+def carregar_memo(path: Path, regras: dict) -> dict:
+    """
+    Memo nome do estabelecimento → classificação, gravado em disco entre execuções.
+
+    Só vale para o regras.csv com o mesmo hash (regras["versao"]); se a regra
+    mudou, o memo inteiro é descartado e refeito na próxima classificação.
+    """
+    entradas = {}
+    descartado = False
+    try:
+        salvo = json.loads(path.read_text(encoding="utf-8"))
+        if salvo.get("formato") == VERSAO_MEMO and salvo.get("regras") == regras.get("versao"):
+            entradas = salvo["entradas"]
+        else:
+            descartado = True
+    except (OSError, json.JSONDecodeError, AttributeError, KeyError):
+        pass
+    return {
+        "caminho": path,
+        "regras": regras.get("versao"),
+        "entradas": entradas,
+        "descartado": descartado,
+        "consultas": 0,
+        "acertos": 0,
+        "novas": 0,
+    }
+
+
+def classificar_com_memo(estabelecimento: str, regras: dict, memo: dict = None) -> tuple:
+    """classificar() consultando o memo antes (memo=None classifica direto)."""
+    if memo is None:
+        return classificar(estabelecimento, regras)
+
+    # classificar só olha o nome em minúsculas; no nível 3 devolve o original
+    chave = estabelecimento.lower()
+    memo["consultas"] += 1
+    salvo = memo["entradas"].get(chave)
+    if salvo is not None:
+        memo["acertos"] += 1
+        if salvo[3] == 3:
+            return estabelecimento, "", "", 3
+        return tuple(salvo)
+
+    resultado = classificar(estabelecimento, regras)
+    memo["entradas"][chave] = ["", "", "", 3] if resultado[3] == 3 else list(resultado)
+    memo["novas"] += 1
+    return resultado
+
+
+def salvar_memo(memo: dict):
+    """Grava o memo se ganhou entradas ou foi refeito (troca atômica do arquivo)."""
+    if memo is None or memo["regras"] is None or not (memo["novas"] or memo["descartado"]):
+        return
+    caminho = memo["caminho"]
+    conteudo = {"formato": VERSAO_MEMO, "regras": memo["regras"], "entradas": memo["entradas"]}
+    try:
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        tmp = caminho.with_name(caminho.name + ".tmp")
+        tmp.write_text(json.dumps(conteudo, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, caminho)
+    except OSError as e:
+        print(f"⚠  Memo de classificações não gravado: {e}")
+
+
+# ── GEMINI ────────────────────────────────────────────────────────────────────
+
+
+class ErroExtracao(Exception):
+    """Resposta do Gemini que não é o JSON esperado; o texto recebido fica em .resposta."""
+
+    def __init__(self, mensagem: str, resposta: str):
+        super().__init__(mensagem)
+        self.resposta = resposta
+
+
+def _genai():
+    """Importa o google-genai só quando a API é chamada (reclassify e benchmark não precisam)."""
+    try:
+        from google import genai
+    except ImportError:
+        print("Erro: instale o pacote com: pip install google-genai")
+        sys.exit(1)
+    return genai
+
+
+def criar_cliente(api_key: str):
+    return _genai().Client(api_key=api_key)
+
+
+def interpretar_resposta(text: str) -> dict:
+    """Tira as cercas de markdown e interpreta o JSON; ErroExtracao se não for válido."""
+    text = (text or "").strip()
+    text = re.sub(r"^```(?:json)?\s*", "", text, flags=re.MULTILINE)
+    text = re.sub(r"\s*```\s*$", "", text, flags=re.MULTILINE)
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError as e:
+        raise ErroExtracao(str(e), text) from e
+
+
+def chave_cache(pdf_bytes: bytes, prompt: str, modelo: str = MODELO_GEMINI) -> str:
+    """SHA-256 do conteúdo do PDF + hash do prompt + modelo: muda se qualquer um mudar."""
+    h = hashlib.sha256()
+    h.update(hashlib.sha256(pdf_bytes).digest())
+    h.update(hashlib.sha256(prompt.encode("utf-8")).digest())
+    h.update(modelo.encode("utf-8"))
+    return h.hexdigest()
+
+
+def ler_cache(cache_dir: Path, chave: str):
+    """JSON extraído da resposta guardada, ou None (ausente, corrompida ou inválida)."""
+    caminho = cache_dir / f"{chave}.json.gz"
+    try:
+        with gzip.open(caminho, "rt", encoding="utf-8") as f:
+            return interpretar_resposta(json.load(f)["resposta"])
+    except (OSError, EOFError, KeyError, TypeError, json.JSONDecodeError, ErroExtracao):
+        return None
+
+
+def gravar_cache(cache_dir: Path, chave: str, pdf_path: Path, resposta: str):
+    """Guarda o texto da resposta comprimido (troca atômica; falha de disco só avisa)."""
+    caminho = cache_dir / f"{chave}.json.gz"
+    registro = {"pdf": pdf_path.name, "modelo": MODELO_GEMINI, "resposta": resposta}
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp = caminho.with_name(caminho.name + f".{os.getpid()}.{time.monotonic_ns()}.tmp")
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            json.dump(registro, f, ensure_ascii=False)
+        os.replace(tmp, caminho)
+    except OSError as e:
+        print(f"⚠  Resposta de {pdf_path.name} não guardada em cache: {e}")
+
+
+def extrair(client, pdf_path: Path, prompt: str, cache_dir: Path = None, renovar: bool = False) -> tuple:
+    """
+    Envia o PDF e devolve (JSON extraído, veio_do_cache).
+
+    client é um genai.Client ou qualquer objeto com files.upload e
+    models.generate_content (um cliente falso, em testes sem rede). Com
+    cache_dir, uma resposta já paga para o mesmo PDF, prompt e modelo volta
+    sem chamar a API; renovar=True ignora a guardada e grava a nova.
+    """
+    chave = None
+    if cache_dir is not None:
+        chave = chave_cache(pdf_path.read_bytes(), prompt)
+        if not renovar:
+            dados = ler_cache(cache_dir, chave)
+            if dados is not None:
+                return dados, True
 
-    print(f"📤 Enviando {pdf_path.name} para Gemini API...")
     with open(pdf_path, "rb") as f:
         uploaded = client.files.upload(
             file=f,
-            config=genai_types.UploadFileConfig(
-                mime_type="application/pdf",
-                display_name=pdf_path.name,
-            ),
+            config={"mime_type": "application/pdf", "display_name": pdf_path.name},
         )
 
     response = client.models.generate_content(
-        model="gemini-2.5-flash",
+        model=MODELO_GEMINI,
         contents=[uploaded, prompt],
     )
+    dados = interpretar_resposta(response.text)
+    # Só respostas válidas entram no cache; uma quebrada será pedida de novo
+    if chave is not None:
+        gravar_cache(cache_dir, chave, pdf_path, response.text)
+    return dados, False
 
-    text = response.text.strip()
-    text = re.sub(r"^```(?:json)?\s*", "", text, flags=re.MULTILINE)
-    text = re.sub(r"\s*```\s*$", "", text, flags=re.MULTILINE)
 
+def extrair_via_gemini(pdf_path: Path, api_key: str, regras_path: Path,
+                       cache_dir: Path = None, renovar: bool = False) -> dict:
+    client = criar_cliente(api_key)
+    prompt = _build_prompt(regras_path)
+
+    print(f"📤 Enviando {pdf_path.name} para Gemini API...")
     try:
-        return json.loads(text)
-    except json.JSONDecodeError as e:
+        dados, do_cache = extrair(client, pdf_path, prompt, cache_dir, renovar)
+    except ErroExtracao as e:
         print(f"\nErro ao interpretar JSON do Gemini: {e}")
-        print("Resposta recebida:\n", text[:500])
+        print("Resposta recebida:\n", e.resposta[:500])
         sys.exit(1)
+    if do_cache:
+        print("⚡ Resposta já em cache para este PDF e prompt — nenhuma chamada à API")
+    return dados
+
+
+def extrair_lote(pdfs: list, client, prompt: str, paralelo: int = LOTE_PARALELO,
+                 tentativas: int = LOTE_TENTATIVAS, espera: float = LOTE_ESPERA_SEGUNDOS,
+                 cache_dir: Path = None, renovar: bool = False) -> list:
+    """
+    Extrai vários PDFs ao mesmo tempo com um único client (pool de threads limitado).
+
+    Cada arquivo tem até `tentativas` chamadas, com espera dobrando entre elas.
+    Retorna, na ordem de pdfs, dicts {pdf, dados, cache, erro, tentativas, segundos}:
+    dados é None quando todas as tentativas falharam.
+    """
+    def extrair_um(pdf):
+        inicio = time.perf_counter()
+        erro = None
+        for n in range(1, tentativas + 1):
+            try:
+                dados, do_cache = extrair(client, pdf, prompt, cache_dir, renovar)
+                return {"pdf": pdf, "dados": dados, "cache": do_cache, "erro": None, "tentativas": n,
+                        "segundos": time.perf_counter() - inicio}
+            except Exception as e:  # rede, cota, JSON inválido: tudo merece nova tentativa
+                erro = e
+                if n < tentativas:
+                    time.sleep(espera * 2 ** (n - 1))
+        return {"pdf": pdf, "dados": None, "cache": False, "erro": f"{type(erro).__name__}: {erro}",
+                "tentativas": tentativas, "segundos": time.perf_counter() - inicio}
+
+    resultados = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(paralelo, len(pdfs)))) as pool:
+        futuros = {pool.submit(extrair_um, pdf): pdf for pdf in pdfs}
+        for futuro in as_completed(futuros):
+            r = futuro.result()
+            resultados[r["pdf"]] = r
+            if r["dados"] is not None:
+                origem = "cache" if r["cache"] else f"{r['segundos']:.1f}s"
+                print(f"   ✓ {r['pdf'].name} ({len(r['dados'].get('transacoes', []))} transações, {origem})")
+            else:
+                print(f"   ✗ {r['pdf'].name}: {r['erro']}")
+    return [resultados[pdf] for pdf in pdfs]
+
+
+# ── STREAMING ─────────────────────────────────────────────────────────────────
+
+_INCOMPLETO = object()
+_FIM_DE_NUMERO = frozenset(",}] \t\r\n")
+
+
+class LeitorTransacoes:
+    """
+    Parser incremental do JSON da fatura. alimentar() recebe os pedaços de texto
+    do stream e devolve as transações de "transacoes" cujo objeto já fechou; os
+    outros campos do topo (total_fatura, mes_ano) vão para .campos. Cercas de
+    markdown antes do "{" e depois do "}" final são ignoradas.
+
+    .completo só fica True quando o objeto do topo fecha: resposta truncada
+    deixa .transacoes com tudo que chegou inteiro. Vírgula faltando ou sobrando,
+    ou chave que não é string, param a leitura ali e ficam em .erro (o
+    json.loads da resposta inteira também recusaria).
+    """
+
+    def __init__(self):
+        self.campos = {}
+        self.transacoes = []
+        self.completo = False
+        self.erro = None
+        self._buf = ""
+        self._pos = 0
+        self._estado = "inicio"  # inicio → chave → dois_pontos → valor (→ lista) → chave … → fim
+        self._chave = None
+        self._itens = 0  # valores já lidos no objeto do topo ou na lista aberta
+        self._itens_topo = 0  # os do topo, guardados enquanto a lista está aberta
+        self._virgula = False  # acabou de passar uma vírgula: vem outro valor
+        self._decoder = json.JSONDecoder()
+
+    def alimentar(self, texto: str, fim: bool = False) -> list:
+        """fim=True no último pedaço: um número no fim do texto já não pode continuar."""
+        self._buf += texto
+        novas = []
+        while self._passo(novas, fim):
+            pass
+        # Descarta o que já foi consumido; o resto é um valor ainda incompleto
+        self._buf = self._buf[self._pos:]
+        self._pos = 0
+        return novas
+
+    def dados(self) -> dict:
+        return {**self.campos, "transacoes": list(self.transacoes)}
+
+    def _pular(self, tambem: str = ""):
+        buf = self._buf
+        while self._pos < len(buf) and (buf[self._pos].isspace() or buf[self._pos] in tambem):
+            self._pos += 1
+        return buf[self._pos] if self._pos < len(buf) else None
+
+    def _decodificar(self, fim: bool):
+        try:
+            valor, final = self._decoder.raw_decode(self._buf, self._pos)
+        except json.JSONDecodeError:
+            return _INCOMPLETO  # ainda não chegou inteiro (ou é inválido: .completo dirá)
+        if not fim and (
+            final >= len(self._buf)
+            or (isinstance(valor, (int, float)) and self._buf[final] not in _FIM_DE_NUMERO)
+        ):
+            return _INCOMPLETO  # "12" ou "12." podem ser o começo de "12.50"
+        self._pos = final
+        return valor
+
+    def _invalido(self, motivo: str) -> bool:
+        self.erro = f"JSON inválido: {motivo}"
+        return False
+
+    def _passo(self, novas: list, fim: bool) -> bool:
+        if self.erro is not None:
+            return False
+        if self._estado == "inicio":
+            inicio = self._buf.find("{", self._pos)
+            if inicio < 0:
+                self._pos = len(self._buf)
+                return False
+            self._pos = inicio + 1
+            self._estado = "chave"
+            return True
+
+        if self._estado in ("chave", "lista"):
+            c = self._pular()
+            if c is None:
+                return False
+            if c == ",":
+                if not self._itens or self._virgula:
+                    return self._invalido("vírgula sobrando")
+                self._pos += 1
+                self._virgula = True
+                return True
+            if c in "}]":
+                if c != ("}" if self._estado == "chave" else "]") or self._virgula:
+                    return self._invalido(f"'{c}' fora de lugar")
+                self._pos += 1
+                self._virgula = False
+                if self._estado == "chave":
+                    self._estado = "fim"
+                    self.completo = True
+                    return False
+                self._estado = "chave"
+                self._itens = self._itens_topo + 1  # a lista conta como um valor do topo
+                return True
+            if self._itens and not self._virgula:
+                return self._invalido("falta vírgula entre dois valores")
+            valor = self._decodificar(fim)
+            if valor is _INCOMPLETO:
+                return False
+            self._virgula = False
+            if self._estado == "chave":
+                if not isinstance(valor, str):
+                    return self._invalido(f"chave {valor!r} não é string")
+                self._chave = valor
+                self._estado = "dois_pontos"
+            else:
+                self._itens += 1
+                self.transacoes.append(valor)
+                novas.append(valor)
+            return True
+
+        if self._estado == "dois_pontos":
+            c = self._pular()
+            if c is None:
+                return False
+            if c != ":":
+                return self._invalido(f"falta ':' depois da chave {self._chave!r}")
+            self._pos += 1
+            self._estado = "valor"
+            return True
+
+        if self._estado == "valor":
+            c = self._pular()
+            if c is None:
+                return False
+            if self._chave == "transacoes" and c == "[":
+                self._pos += 1
+                self._estado = "lista"
+                self._itens_topo, self._itens = self._itens, 0
+                return True
+            valor = self._decodificar(fim)
+            if valor is _INCOMPLETO:
+                return False
+            self.campos[self._chave] = valor
+            self._estado = "chave"
+            self._itens += 1
+            return True
+
+        return False  # fim: o que vier depois (cerca de markdown) é ignorado
+
+
+def _gravar_parcial(caminho: Path, leitor: LeitorTransacoes):
+    """Checkpoint no formato do _raw.json (mais "parcial": true), com troca atômica."""
+    tmp = caminho.with_name(caminho.name + ".tmp")
+    tmp.write_text(json.dumps({**leitor.dados(), "parcial": True}, ensure_ascii=False, indent=2))
+    os.replace(tmp, caminho)
+
+
+def extrair_stream(client, pdf_path: Path, prompt: str, leitor: LeitorTransacoes,
+                   checkpoint: Path = None, cache_dir: Path = None, renovar: bool = False):
+    """
+    Gerador: transações do PDF à medida que o modelo as emite.
+
+    client precisa de files.upload e models.generate_content_stream (um stream
+    falso serve). A cada pedaço que completa transações, checkpoint recebe tudo
+    o que já chegou, antes de as transações seguirem adiante. Resposta completa:
+    vai para o cache (se cache_dir) e o checkpoint é apagado. Truncada:
+    ErroExtracao, com o checkpoint preservado. Com resposta em cache, nenhuma
+    chamada à API.
+    """
+    chave = None
+    if cache_dir is not None:
+        chave = chave_cache(pdf_path.read_bytes(), prompt)
+        guardados = None if renovar else ler_cache(cache_dir, chave)
+        if guardados is not None:
+            yield from leitor.alimentar(json.dumps(guardados, ensure_ascii=False), fim=True)
+            if checkpoint is not None:
+                checkpoint.unlink(missing_ok=True)
+            return
+
+    with open(pdf_path, "rb") as f:
+        uploaded = client.files.upload(
+            file=f,
+            config={"mime_type": "application/pdf", "display_name": pdf_path.name},
+        )
+
+    pedacos = []
+    stream = client.models.generate_content_stream(
+        model=MODELO_GEMINI,
+        contents=[uploaded, prompt],
+    )
+    for pedaco in stream:
+        texto = pedaco.text or ""
+        pedacos.append(texto)
+        novas = leitor.alimentar(texto)
+        if novas and checkpoint is not None:
+            _gravar_parcial(checkpoint, leitor)
+        yield from novas
+
+    novas = leitor.alimentar("", fim=True)
+    resposta = "".join(pedacos)
+    if not leitor.completo and checkpoint is not None and leitor.transacoes:
+        _gravar_parcial(checkpoint, leitor)
+    # Transação fechada bem no fim do texto só sai agora, mesmo se truncada depois dela
+    yield from novas
+    if not leitor.completo:
+        motivo = leitor.erro or "resposta truncada"
+        raise ErroExtracao(f"{motivo} após {len(leitor.transacoes)} transação(ões)", resposta)
+
+    if chave is not None:
+        gravar_cache(cache_dir, chave, pdf_path, resposta)
+    if checkpoint is not None:
+        checkpoint.unlink(missing_ok=True)
+
+
+def _com_progresso(transacoes, inicio: float):
+    """Repassa as transações mostrando o tempo até a primeira e a contagem."""
+    n = 0
+    for n, tx in enumerate(transacoes, 1):
+        if n == 1:
+            print(f"   ⏱  1ª transação em {time.perf_counter() - inicio:.1f}s")
+        print(f"\r   {n} transação(ões) classificada(s)", end="", flush=True)
+        yield tx
+    if n:
+        print()
+
+
+def extrair_via_gemini_stream(pdf_path: Path, api_key: str, regras_path: Path, regras: dict,
+                              checkpoint: Path, mes_ano: str = None, memo: dict = None,
+                              cache_dir: Path = None, renovar: bool = False, client=None) -> tuple:
+    """
+    Como extrair_via_gemini, mas cada transação passa pelo processar assim que
+    chega. Retorna (dados, (linhas, inferidos, contadores)).
+
+    Se o stream cair ou vier truncado, as transações completas ficam em
+    checkpoint (reclassificável como qualquer _raw.json) e o processo termina.
+    """
+    client = client or criar_cliente(api_key)
+    prompt = _build_prompt(regras_path)
+    leitor = LeitorTransacoes()
+
+    print(f"📤 Enviando {pdf_path.name} para Gemini API (streaming)...")
+    inicio = time.perf_counter()
+    transacoes = extrair_stream(client, pdf_path, prompt, leitor, checkpoint, cache_dir, renovar)
+    try:
+        # mes_ano chega antes da lista no JSON, mas processar precisa dele já: corrigido abaixo
+        processado = processar({"transacoes": _com_progresso(transacoes, inicio)}, regras, mes_ano or "", memo)
+    except Exception as e:  # ErroExtracao, queda de rede, cota: o checkpoint já tem o que chegou
+        print(f"\nErro na extração em streaming: {e}")
+        if checkpoint.exists():
+            rotulo = checkpoint.name.removesuffix("_raw.json")
+            print(f"💾 {len(leitor.transacoes)} transação(ões) parciais em {checkpoint.name}")
+            sufixo = "" if leitor.campos.get("mes_ano") else " --mes-ano YYYY-MM"
+            print(f"   python parse_pdf.py --reclassify {rotulo}{sufixo}")
+        sys.exit(1)
+
+    dados = leitor.dados()
+    for linha in processado[0]:
+        linha["MesAno"] = mes_ano or dados.get("mes_ano", "")
+    print(f"✅ Resposta completa em {time.perf_counter() - inicio:.1f}s")
+    return dados, processado
 
 
 def formatar_br(valor: float) -> str:
     return f"{valor:.2f}".replace(".", ",")
 
 
-def processar(dados: dict, regras: list, mes_ano: str) -> tuple:
-    """Retorna (linhas_csv, inferidos, contadores_nivel)."""
+def processar(dados: dict, regras: dict, mes_ano: str, memo: dict = None) -> tuple:
+    """Retorna (linhas_csv, inferidos, contadores_nivel). memo vem de carregar_memo."""
     linhas = []
     inferidos = []
     vistos = {}
@@ -215,7 +802,7 @@ def processar(dados: dict, regras: list, mes_ano: str) -> tuple:
         valor_total = valor_absoluto * total_parcelas
         data_iso = str(tx.get("data", ""))
 
-        nome_pad, categoria, subcategoria, nivel = classificar(estab_limpo, regras)
+        nome_pad, categoria, subcategoria, nivel = classificar_com_memo(estab_limpo, regras, memo)
         contadores[nivel] += 1
 
         if nivel == 3:
@@ -276,12 +863,18 @@ def reconciliar(linhas: list, total_fatura: float):
         print("   ⚠  Diferença acima de R$ 0,02 — verifique encargos ou IOF omitidos")
 
 
-def imprimir_resultado(inferidos: list, contadores: dict):
+def imprimir_resultado(inferidos: list, contadores: dict, memo: dict = None):
     total = sum(contadores.values())
     print(f"\n📋 Classificação ({total} transações):")
     print(f"   Nível 1 — match direto:      {contadores[1]:>3}")
     print(f"   Nível 2 — match por palavra: {contadores[2]:>3}")
     print(f"   Nível 3 — inferido (Gemini): {contadores[3]:>3}")
+    if memo is not None and memo["consultas"]:
+        taxa = memo["acertos"] / memo["consultas"] * 100
+        print(f"   Memo: {memo['acertos']}/{memo['consultas']} do cache ({taxa:.0f}%), "
+              f"{len(memo['entradas'])} nomes guardados")
+        if memo["descartado"]:
+            print("   ↻  regras.csv mudou desde o último uso — memo refeito")
 
     if not inferidos:
         print("\n✅ Nenhum item inferido — todas as transações foram classificadas pelo regras.csv")
@@ -313,7 +906,17 @@ def cmd_extrair(args, projeto_root: Path):
     regras_path = projeto_root / "data" / "regras.csv"
     regras = carregar_regras(regras_path)
 
-    dados = extrair_via_gemini(pdf_path, api_key, regras_path)
+    memo = carregar_memo(projeto_root / "data" / ARQUIVO_MEMO, regras)
+
+    cache_dir = None if args.no_cache else projeto_root / "data" / DIR_CACHE_GEMINI
+    processado = None
+    if args.stream:
+        checkpoint = raw_dir / f"{pdf_path.stem}_parcial_raw.json"
+        dados, processado = extrair_via_gemini_stream(
+            pdf_path, api_key, regras_path, regras, checkpoint, args.mes_ano, memo, cache_dir, args.refresh
+        )
+    else:
+        dados = extrair_via_gemini(pdf_path, api_key, regras_path, cache_dir, args.refresh)
 
     mes_ano = args.mes_ano or dados.get("mes_ano", "")
     if not mes_ano:
@@ -324,15 +927,110 @@ def cmd_extrair(args, projeto_root: Path):
     json_path.write_text(json.dumps(dados, ensure_ascii=False, indent=2))
     print(f"💾 JSON salvo em {json_path.relative_to(projeto_root)}")
 
-    linhas, inferidos, contadores = processar(dados, regras, mes_ano)
+    linhas, inferidos, contadores = processado or processar(dados, regras, mes_ano, memo)
+    salvar_memo(memo)
     reconciliar(linhas, float(dados.get("total_fatura", 0)))
-    imprimir_resultado(inferidos, contadores)
+    imprimir_resultado(inferidos, contadores, memo)
 
     if inferidos:
         print(f"\n💡 Após atualizar regras.csv, rode:")
         print(f"   python parse_pdf.py --reclassify {mes_ano.replace('-', '')}")
 
 
+def _rotulos_lote(resultados: list, mes_forcado: str = None) -> list:
+    """
+    YYYYMM de cada extração bem-sucedida (None nas falhas). Se dois PDFs caem no
+    mesmo mês (cartões diferentes), os dois levam o nome do arquivo: YYYYMM_nome.
+    """
+    meses = [
+        (mes_forcado or r["dados"].get("mes_ano", "")).replace("-", "") if r["dados"] is not None else None
+        for r in resultados
+    ]
+    rotulos = []
+    for r, mes in zip(resultados, meses):
+        if mes is None:
+            rotulos.append(None)
+        elif not mes or meses.count(mes) > 1:
+            rotulos.append(f"{mes}_{r['pdf'].stem}" if mes else r["pdf"].stem)
+        else:
+            rotulos.append(mes)
+    return rotulos
+
+
+def executar_lote(pdfs: list, client, projeto_root: Path, mes_ano: str = None,
+                  paralelo: int = LOTE_PARALELO, tentativas: int = LOTE_TENTATIVAS,
+                  espera: float = LOTE_ESPERA_SEGUNDOS, usar_cache: bool = True,
+                  renovar: bool = False) -> list:
+    """Extrai os PDFs, grava um <rótulo>_raw.json por fatura e imprime o resumo. Retorna os resultados."""
+    raw_dir = projeto_root / "data" / "raw"
+    raw_dir.mkdir(parents=True, exist_ok=True)
+    regras_path = projeto_root / "data" / "regras.csv"
+    regras = carregar_regras(regras_path)
+    memo = carregar_memo(projeto_root / "data" / ARQUIVO_MEMO, regras)
+
+    print(f"📤 Enviando {len(pdfs)} PDF(s) para Gemini API ({min(paralelo, len(pdfs))} por vez)...")
+    cache_dir = projeto_root / "data" / DIR_CACHE_GEMINI if usar_cache else None
+    resultados = extrair_lote(
+        pdfs, client, _build_prompt(regras_path), paralelo, tentativas, espera, cache_dir, renovar
+    )
+
+    for r, rotulo in zip(resultados, _rotulos_lote(resultados, mes_ano)):
+        r["rotulo"] = rotulo
+        if r["dados"] is None:
+            continue
+        (raw_dir / f"{rotulo}_raw.json").write_text(json.dumps(r["dados"], ensure_ascii=False, indent=2))
+        _, inferidos, contadores = processar(r["dados"], regras, mes_ano or r["dados"].get("mes_ano", ""), memo)
+        r["transacoes"] = sum(contadores.values())
+        r["inferidos"] = len(inferidos)
+    salvar_memo(memo)
+
+    largura = max(len(r["pdf"].name) for r in resultados)
+    largura_json = max([len(r["rotulo"]) + len("_raw.json") for r in resultados if r["rotulo"]] + [4])
+    print(f"\n📋 Lote ({len(resultados)} PDFs):")
+    print(f"   {'PDF':<{largura}}  {'JSON':<{largura_json}}  {'Transações':>10}  {'Inferidos':>9}  {'Tent.':>5}  {'Tempo':>6}  Origem")
+    for r in resultados:
+        if r["dados"] is None:
+            print(f"   {r['pdf'].name:<{largura}}  ✗ {r['erro'][:60]}")
+            continue
+        print(
+            f"   {r['pdf'].name:<{largura}}  {r['rotulo'] + '_raw.json':<{largura_json}}  {r['transacoes']:>10}  "
+            f"{r['inferidos']:>9}  {r['tentativas']:>5}  {r['segundos']:>5.1f}s  {'cache' if r['cache'] else 'API'}"
+        )
+
+    ok = [r for r in resultados if r["dados"] is not None]
+    print(f"\n{'✅' if len(ok) == len(resultados) else '⚠ '} {len(ok)}/{len(resultados)} extraídos em {raw_dir.relative_to(projeto_root)}")
+    if ok:
+        print("💡 Para gerar os CSVs:")
+        for r in ok:
+            print(f"   python parse_pdf.py --reclassify {r['rotulo']}")
+    return resultados
+
+
+def cmd_lote(args, projeto_root: Path):
+    """Extrai todos os PDFs de uma pasta, em paralelo, com um client compartilhado."""
+    pasta = Path(args.batch).expanduser().resolve()
+    if not pasta.is_dir():
+        print(f"Erro: pasta não encontrada: {pasta}")
+        sys.exit(1)
+    pdfs = sorted(p for p in pasta.iterdir() if p.suffix.lower() == ".pdf")
+    if not pdfs:
+        print(f"Erro: nenhum PDF em {pasta}")
+        sys.exit(1)
+
+    api_key = os.environ.get("GEMINI_API_KEY")
+    if not api_key:
+        print("Erro: GEMINI_API_KEY não definida em .env ou no ambiente")
+        sys.exit(1)
+
+    resultados = executar_lote(
+        pdfs, criar_cliente(api_key), projeto_root, args.mes_ano,
+        paralelo=args.paralelo, tentativas=args.tentativas,
+        usar_cache=not args.no_cache, renovar=args.refresh,
+    )
+    if any(r["dados"] is None for r in resultados):
+        sys.exit(1)
+
+
 def cmd_reclassify(args, projeto_root: Path):
     """Lê JSON bruto, aplica regras.csv atualizado e gera CSV."""
     raw_dir = projeto_root / "data" / "raw"
@@ -344,12 +1042,14 @@ def cmd_reclassify(args, projeto_root: Path):
         sys.exit(1)
 
     regras = carregar_regras(projeto_root / "data" / "regras.csv")
+    memo = carregar_memo(projeto_root / "data" / ARQUIVO_MEMO, regras)
     dados = json.loads(json_path.read_text())
     mes_ano = args.mes_ano or dados.get("mes_ano", "")
 
-    linhas, inferidos, contadores = processar(dados, regras, mes_ano)
+    linhas, inferidos, contadores = processar(dados, regras, mes_ano, memo)
+    salvar_memo(memo)
     reconciliar(linhas, float(dados.get("total_fatura", 0)))
-    imprimir_resultado(inferidos, contadores)
+    imprimir_resultado(inferidos, contadores, memo)
 
     if inferidos:
         resp = input(f"\n⚠  Ainda há {len(inferidos)} inferido(s). Gerar CSV com categoria 'Diversos'? (s/N): ").strip().lower()
@@ -394,17 +1094,28 @@ def main():
             "  python parse_pdf.py fatura.pdf\n"
             "  python parse_pdf.py --reclassify 202602\n"
             "  python parse_pdf.py --reclassify 202602 --mes-ano 2026-02\n"
+            "  python parse_pdf.py --batch faturas/ --paralelo 4\n"
+            "  python parse_pdf.py fatura.pdf --stream\n"
         ),
     )
     parser.add_argument("pdf", nargs="?", help="Caminho para o PDF da fatura")
     parser.add_argument("--reclassify", metavar="YYYYMM", help="Reclassifica JSON salvo e gera CSV")
     parser.add_argument("--mes-ano", help="Forçar mês/ano no formato YYYY-MM")
+    parser.add_argument("--batch", metavar="DIR", help="Extrai todos os PDFs da pasta em paralelo")
+    parser.add_argument("--paralelo", type=int, default=LOTE_PARALELO, help="PDFs em voo ao mesmo tempo no --batch")
+    parser.add_argument("--tentativas", type=int, default=LOTE_TENTATIVAS, help="Tentativas por PDF no --batch")
+    parser.add_argument("--stream", action="store_true", help="Classifica as transações enquanto o Gemini responde")
+    cache = parser.add_mutually_exclusive_group()
+    cache.add_argument("--no-cache", action="store_true", help="Não lê nem grava respostas em data/cache_gemini/")
+    cache.add_argument("--refresh", action="store_true", help="Chama a API mesmo com resposta em cache e a substitui")
     args = parser.parse_args()
 
     projeto_root = Path(__file__).parent
 
     if args.reclassify:
         cmd_reclassify(args, projeto_root)
+    elif args.batch:
+        cmd_lote(args, projeto_root)
     elif args.pdf:
         cmd_extrair(args, projeto_root)
     else:
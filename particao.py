@@ -0,0 +1,65 @@
+"""
+particao.py — Índice de partições por mês sobre o dataset ordenado por MesAno.
+
+O armazém (ingestao.py) grava as transações agrupadas por mês, em ordem
+cronológica, então cada mês é um bloco contíguo de linhas. O índice guarda o
+slice de cada bloco: pegar um mês ou uma janela de meses vira um iloc O(1) em vez
+de uma máscara booleana sobre todo o histórico.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def _codigos_mes(df):
+    return df["MesAno"].cat.codes.to_numpy()
+
+
+def ordenar_por_mes(df):
+    """Agrupa as linhas por mês (ordem cronológica), mantendo a ordem dentro do mês."""
+    codigos = _codigos_mes(df)
+    if len(codigos) < 2 or (np.diff(codigos) >= 0).all():
+        return df
+    return df.sort_values("MesAno", kind="stable", ignore_index=True)
+
+
+def indexar_meses(df):
+    """Mapa mês → slice das linhas do mês. O df precisa vir de ordenar_por_mes."""
+    codigos = _codigos_mes(df)
+    if len(codigos) == 0:
+        return {}
+    if (np.diff(codigos) < 0).any():
+        raise ValueError("DataFrame não está ordenado por MesAno (use ordenar_por_mes)")
+
+    quebras = np.flatnonzero(np.diff(codigos)) + 1
+    inicios = np.r_[0, quebras]
+    fins = np.r_[quebras, len(codigos)]
+    categorias = df["MesAno"].cat.categories
+    return {
+        categorias[codigos[i]]: slice(int(i), int(f))
+        for i, f in zip(inicios, fins)
+        if codigos[i] >= 0  # MesAno nulo (-1) não pertence a nenhum mês
+    }
+
+
+def fatiar(df, indice, meses):
+    """Linhas de um mês (str) ou de uma lista de meses, sem varrer o DataFrame."""
+    if isinstance(meses, str):
+        meses = [meses]
+    blocos = sorted(
+        (indice[m] for m in meses if m in indice), key=lambda s: s.start
+    )
+    if not blocos:
+        return df.iloc[0:0]
+
+    # Meses vizinhos são blocos vizinhos: uma janela contínua vira um único slice
+    unidos = [blocos[0]]
+    for bloco in blocos[1:]:
+        if bloco.start == unidos[-1].stop:
+            unidos[-1] = slice(unidos[-1].start, bloco.stop)
+        else:
+            unidos.append(bloco)
+
+    if len(unidos) == 1:
+        return df.iloc[unidos[0]]
+    return pd.concat([df.iloc[s] for s in unidos])
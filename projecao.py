@@ -0,0 +1,119 @@
+"""
+projecao.py — Projeção vetorizada das parcelas ativas (aba Futuro & Dívida).
+
+Datas viram ordinais de mês (datetime64[M] como inteiro) e a projeção mês a mês
+é expandida com np.repeat/np.arange, em vez de apply com pd.DateOffset e
+iterrows com um laço por mês restante. A paridade com a versão original é
+conferida por paridade.py.
+"""
+
+import numpy as np
+import pandas as pd
+
+COLUNAS_TABELA = [
+    "Estabelecimento",
+    "Valor_Total_Compra",
+    "Valor_View",
+    "TotalParcelas",
+    "ParcelaAtual",
+    "Ultima_Parcela_Fmt",
+    "Data_Final",
+]
+CHAVES_GRAFICO = ["Mes_Sort", "Mês Referência", "Estabelecimento"]
+
+
+# ── VETORIZADO ────────────────────────────────────────────────────────────────
+
+
+def _data_base(df_mes):
+    try:
+        return pd.to_datetime(df_mes["MesAno"].iloc[0] + "-01")
+    except (ValueError, IndexError, KeyError):
+        return pd.Timestamp.now().normalize()
+
+
+def _somar_meses(data_base, meses):
+    """
+    data_base + pd.DateOffset(months=m) para um array de inteiros m.
+
+    O dia é limitado ao último dia do mês de destino, como no DateOffset
+    (31/01 + 1 mês = 28/02); com data_base no dia 1 é só aritmética de mês.
+    """
+    ordinal = np.datetime64(data_base, "M").astype(np.int64) + meses
+    inicio_mes = ordinal.astype("datetime64[M]")
+    dias_no_mes = ((inicio_mes + 1).astype("datetime64[D]") - inicio_mes.astype("datetime64[D]")).astype(np.int64)
+    dia = np.minimum(data_base.day, dias_no_mes)
+    return inicio_mes.astype("datetime64[ns]") + (dia - 1).astype("timedelta64[D]")
+
+
+def _rotulos_mes(ordinais, formato):
+    """Formata ordinais de mês (anos desde 1970 × 12 + mês) só uma vez por mês distinto."""
+    unicos, posicoes = np.unique(ordinais, return_inverse=True)
+    anos, meses = np.divmod(unicos, 12)
+    rotulos = np.array(
+        [formato.format(ano=1970 + a, mes=m + 1) for a, m in zip(anos, meses)],
+        dtype=object,
+    )
+    return rotulos[posicoes]
+
+
+def projetar(df_mes):
+    """
+    Retorna (df_tabela, df_grafico) das compras parceladas ainda ativas no mês.
+
+    df_tabela: uma linha por compra, com a data da última parcela.
+    df_grafico: valor comprometido por mês futuro e estabelecimento.
+    (None, None) se não houver parcelas ativas.
+    """
+    if df_mes.empty:
+        return None, None
+
+    # FILTRO DUPLO: Só é ativo se (Total > 1) E (EhParcela == 1)
+    ativos = df_mes[
+        (df_mes["TotalParcelas"] > 1)
+        & (df_mes["ParcelaAtual"] < df_mes["TotalParcelas"])
+        & (df_mes["EhParcela"] == 1)  # O Juiz entra em ação aqui também
+    ].copy()
+
+    if ativos.empty:
+        return None, None
+
+    data_base = _data_base(df_mes)
+
+    ativos["Valor_Total_Compra"] = ativos["Valor_View"] * ativos["TotalParcelas"]
+    ativos["Meses_Restantes"] = ativos["TotalParcelas"] - ativos["ParcelaAtual"]
+
+    restantes = ativos["Meses_Restantes"].to_numpy(dtype=np.int64)
+    ativos["Data_Final"] = _somar_meses(data_base, restantes)
+    ativos["Ultima_Parcela_Fmt"] = ativos["Data_Final"].dt.strftime("%m/%Y")
+
+    df_tabela = ativos[COLUNAS_TABELA].sort_values(
+        by=["Data_Final", "Valor_View"], ascending=[False, False]
+    )
+
+    # Uma linha por (compra, mês restante): compra i repetida restantes[i] vezes,
+    # com deslocamentos 1..restantes[i]
+    validos = np.maximum(restantes, 0)
+    total = int(validos.sum())
+    if total == 0:
+        return df_tabela, pd.DataFrame()
+
+    linha = np.repeat(np.arange(len(ativos)), validos)
+    inicio_bloco = np.repeat(np.cumsum(validos) - validos, validos)
+    deslocamento = np.arange(total) - inicio_bloco + 1
+    ordinais = np.datetime64(data_base, "M").astype(np.int64) + deslocamento
+
+    projecao = pd.DataFrame({
+        "Mes_Sort": _rotulos_mes(ordinais, "{ano:04d}-{mes:02d}"),
+        "Mês Referência": _rotulos_mes(ordinais, "{mes:02d}/{ano:04d}"),
+        "Valor": ativos["Valor_View"].to_numpy()[linha],
+        "Estabelecimento": ativos["Estabelecimento"].astype(object).to_numpy()[linha],
+    })
+    df_grafico = (
+        projecao.groupby(CHAVES_GRAFICO, observed=True)["Valor"]
+        .sum()
+        .reset_index()
+        .sort_values("Mes_Sort")
+    )
+    return df_tabela, df_grafico
+
@@ -0,0 +1,76 @@
+"""
+resultados.py — Cache LRU de resultados derivados (anomalias, projeções, comparações).
+
+A chave é (versão dos dados, nome do cálculo, argumentos). A versão muda quando os
+CSVs mudam, então entradas antigas nunca são servidas; saem pelo LRU ou quando
+dimensionar() prepara a versão nova. Não depende do Streamlit: o dashboard usa a cache_key dos CSVs
+como versão e scripts headless usam ingestao.versao_armazem().
+
+A capacidade é RESULTADOS_MAX_ENTRADAS mais o que dimensionar() reservar para
+a versão atual: o aquecimento (aquecimento.py) reserva lugar para todos os
+meses, então o histórico inteiro cabe sem expulsar o que as sessões abrem.
+
+Os resultados são compartilhados entre sessões sem cópia. Quem os recebe não
+deve alterá-los (mesmo contrato de utils.carregar_dados).
+"""
+
+import threading
+from collections import OrderedDict
+
+from constants import RESULTADOS_MAX_ENTRADAS
+
+_CACHE = OrderedDict()
+_TRAVA = threading.Lock()
+_CONTADORES = {"acertos": 0, "faltas": 0}
+_estado = {"capacidade": RESULTADOS_MAX_ENTRADAS}
+
+
+def obter(versao, nome, argumentos, calcular):
+    """
+    Devolve o resultado em cache para (versao, nome, argumentos) ou chama calcular().
+
+    argumentos precisa ser hashable (tupla de meses, strings, números).
+    """
+    chave = (versao, nome, argumentos)
+    with _TRAVA:
+        if chave in _CACHE:
+            _CACHE.move_to_end(chave)
+            _CONTADORES["acertos"] += 1
+            return _CACHE[chave]
+        _CONTADORES["faltas"] += 1
+
+    # Calcula fora da trava: duas sessões pedindo o mesmo mês no mesmo instante
+    # podem calcular em dobro, mas nenhuma espera pela outra.
+    resultado = calcular()
+
+    with _TRAVA:
+        _CACHE[chave] = resultado
+        _CACHE.move_to_end(chave)
+        while len(_CACHE) > _estado["capacidade"]:
+            _CACHE.popitem(last=False)
+    return resultado
+
+
+def dimensionar(versao, entradas):
+    """
+    Reserva lugar para `entradas` resultados da versão dada, além das
+    RESULTADOS_MAX_ENTRADAS de uso livre, e descarta os de outras versões
+    (que nunca mais seriam servidos).
+    """
+    with _TRAVA:
+        _estado["capacidade"] = RESULTADOS_MAX_ENTRADAS + entradas
+        for chave in [c for c in _CACHE if c[0] != versao]:
+            del _CACHE[chave]
+
+
+def limpar():
+    """Esvazia o cache e zera os contadores."""
+    with _TRAVA:
+        _CACHE.clear()
+        _CONTADORES.update(acertos=0, faltas=0)
+
+
+def estatisticas():
+    """{"entradas", "capacidade", "acertos", "faltas"} desde o início do processo (ou do último limpar)."""
+    with _TRAVA:
+        return {"entradas": len(_CACHE), "capacidade": _estado["capacidade"], **_CONTADORES}
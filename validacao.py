@@ -0,0 +1,268 @@
+"""
+validacao.py — Classifica cada CSV de data/raw/ uma única vez, antes da ingestão.
+
+O cabeçalho e as primeiras linhas de cada arquivo novo ou alterado decidem o
+veredito, que fica registrado em data/processed/validacao.json:
+
+  ok         → segue direto para a limpeza, sem nenhuma lógica de reparo
+  deslocado  → colunas escorregaram para a esquerda (arquivo torto); é reparado
+               uma vez e regravado no lugar, com o original guardado em
+               data/quarentena/originais/
+  quarentena → não dá para aproveitar; é movido para data/quarentena/ com o motivo
+"""
+
+import csv
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+DIR_QUARENTENA = Path("data") / "quarentena"
+ARQUIVO_VALIDACAO = "validacao.json"
+
+VEREDITO_OK = "ok"
+VEREDITO_DESLOCADO = "deslocado"
+VEREDITO_QUARENTENA = "quarentena"
+
+LINHAS_AMOSTRA = 20
+COLUNAS_OBRIGATORIAS = ["Data", "Valor_R$", "ParcelaAtual", "TotalParcelas"]
+COLUNAS_REPARO = ["Subcategoria", "EhParcela"]
+
+_RE_MES_ANO = re.compile(r"^\d{4}-\d{2}$")
+
+# Arquivos que o próprio processo regravou ou removeu: caminho absoluto → estado
+# deixado, (mtime_ns, tamanho) ou None se removido. vigia.py consulta para não
+# recarregar o dashboard por causa dos reparos e quarentenas da própria carga.
+_ESCRITAS_PROPRIAS = {}
+_TRAVA_ESCRITAS = threading.Lock()
+
+
+def fingerprint(caminho):
+    """Identidade de um CSV para os caches incrementais: (mtime, tamanho)."""
+    st_info = os.stat(caminho)
+    return {"mtime": st_info.st_mtime, "tamanho": st_info.st_size}
+
+
+def _ler_amostra(caminho):
+    """Cabeçalho (sem espaços) e as primeiras LINHAS_AMOSTRA linhas do CSV."""
+    with open(caminho, encoding="utf-8", newline="") as f:
+        leitor = csv.reader(f)
+        cabecalho = [c.strip() for c in next(leitor, [])]
+        amostra = [linha for _, linha in zip(range(LINHAS_AMOSTRA), leitor)]
+    return cabecalho, amostra
+
+
+def classificar_csv(caminho):
+    """Retorna (veredito, motivo, assinatura) a partir do cabeçalho e da amostra."""
+    try:
+        cabecalho, amostra = _ler_amostra(caminho)
+    except (OSError, UnicodeDecodeError, csv.Error) as e:
+        return VEREDITO_QUARENTENA, f"ilegível: {e}", ""
+
+    assinatura = hashlib.sha1(
+        json.dumps([cabecalho, amostra], ensure_ascii=False).encode("utf-8")
+    ).hexdigest()[:16]
+
+    ausentes = [c for c in COLUNAS_OBRIGATORIAS if c not in cabecalho]
+    if ausentes:
+        return VEREDITO_QUARENTENA, f"colunas ausentes: {', '.join(ausentes)}", assinatura
+
+    if "MesAno" not in cabecalho or not amostra:
+        return VEREDITO_OK, "", assinatura
+
+    # Mesmo critério do carregamento original: maioria de MesAno fora de YYYY-MM
+    pos = cabecalho.index("MesAno")
+    invalidas = sum(
+        1 for linha in amostra
+        if pos >= len(linha) or not _RE_MES_ANO.match(linha[pos])
+    )
+    if invalidas / len(amostra) <= 0.5:
+        return VEREDITO_OK, "", assinatura
+
+    ausentes = [c for c in COLUNAS_REPARO if c not in cabecalho]
+    if ausentes:
+        return (
+            VEREDITO_QUARENTENA,
+            f"deslocado sem colunas para reparo: {', '.join(ausentes)}",
+            assinatura,
+        )
+    return VEREDITO_DESLOCADO, "MesAno inválido na maioria das linhas", assinatura
+
+
+def corrigir_deslocamento(df_temp):
+    """Recupera valor, EhParcela e parcelas de um arquivo com shift à esquerda."""
+    real_valor = df_temp["Subcategoria"].copy()
+
+    # AQUI ESTÁ A CHAVE: Recuperar o 'EhParcela' real
+    # Se houve deslocamento, 'EhParcela' caiu na coluna anterior ('Observacao')
+    if "Observacao" in df_temp.columns:
+        real_eh_parcela = df_temp["Observacao"].copy()
+    else:
+        real_eh_parcela = 0  # Fallback
+
+    # Recupera números das parcelas
+    real_total_parc = df_temp["ParcelaAtual"].copy()
+    real_curr_parc = df_temp["EhParcela"].copy()
+
+    # Aplica Correção
+    df_temp["MesAno"] = np.nan
+    df_temp["Valor_R$"] = real_valor
+    df_temp["EhParcela"] = real_eh_parcela  # Salva o árbitro correto
+    df_temp["TotalParcelas"] = pd.to_numeric(real_total_parc, errors="coerce")
+    df_temp["ParcelaAtual"] = pd.to_numeric(real_curr_parc, errors="coerce")
+
+    return df_temp
+
+
+def reparar_csv(caminho, dir_quarentena=DIR_QUARENTENA):
+    """
+    Corrige um CSV deslocado e regrava no lugar; o original vai para a quarentena.
+
+    MesAno é preenchido a partir da Data (o que a limpeza faria de qualquer
+    jeito), então o arquivo regravado passa na validação como ok.
+    """
+    caminho = Path(caminho)
+    df = pd.read_csv(caminho, encoding="utf-8", engine="python")
+    df.columns = [c.strip() for c in df.columns]
+    df = corrigir_deslocamento(df)
+    df["MesAno"] = pd.to_datetime(df["Data"], errors="coerce").dt.strftime("%Y-%m")
+
+    destino_original = Path(dir_quarentena) / "originais" / caminho.name
+    destino_original.parent.mkdir(parents=True, exist_ok=True)
+    shutil.copy2(caminho, destino_original)
+
+    tmp = caminho.with_suffix(".tmp")
+    df.to_csv(tmp, index=False, encoding="utf-8")
+    os.replace(tmp, caminho)
+    # Quem reparou já vai ingerir o arquivo novo: o vigia não deve recarregar
+    _registrar_escrita(caminho)
+    return destino_original
+
+
+def _estado_arquivo(caminho):
+    try:
+        st_info = os.stat(caminho)
+    except OSError:
+        return None
+    return st_info.st_mtime_ns, st_info.st_size
+
+
+def _registrar_escrita(caminho):
+    caminho = os.path.abspath(caminho)
+    with _TRAVA_ESCRITAS:
+        _ESCRITAS_PROPRIAS[caminho] = _estado_arquivo(caminho)
+
+
+def escrita_propria(caminho):
+    """True se caminho está exatamente como o último reparo/quarentena deste processo o deixou."""
+    caminho = os.path.abspath(caminho)
+    with _TRAVA_ESCRITAS:
+        if caminho not in _ESCRITAS_PROPRIAS:
+            return False
+        return _ESCRITAS_PROPRIAS[caminho] == _estado_arquivo(caminho)
+
+
+def _ler_registro(dir_proc):
+    caminho = Path(dir_proc) / ARQUIVO_VALIDACAO
+    try:
+        registro = json.loads(caminho.read_text())
+    except (OSError, json.JSONDecodeError):
+        registro = {}
+    registro.setdefault("arquivos", {})
+    registro.setdefault("quarentena", {})
+    return registro
+
+
+def _gravar_registro(dir_proc, registro):
+    caminho = Path(dir_proc) / ARQUIVO_VALIDACAO
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    tmp = caminho.with_suffix(".tmp")
+    tmp.write_text(json.dumps(registro, ensure_ascii=False, indent=2))
+    os.replace(tmp, caminho)
+
+
+def _mover_para_quarentena(caminho, motivo, registro, dir_quarentena):
+    caminho = Path(caminho)
+    destino = Path(dir_quarentena) / caminho.name
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    shutil.move(caminho, destino)
+    _registrar_escrita(caminho)
+    registro["arquivos"].pop(caminho.name, None)
+    registro["quarentena"][caminho.name] = {
+        "motivo": motivo,
+        "em": datetime.now().isoformat(timespec="seconds"),
+    }
+    return f"movido para {destino} ({motivo})"
+
+
+def quarentenar(caminho, motivo, dir_proc, dir_quarentena=DIR_QUARENTENA):
+    """Move um CSV que falhou na ingestão para a quarentena e registra o motivo."""
+    registro = _ler_registro(dir_proc)
+    aviso = _mover_para_quarentena(caminho, motivo, registro, dir_quarentena)
+    _gravar_registro(dir_proc, registro)
+    return aviso
+
+
+def validar_arquivos(arquivos, dir_proc, dir_quarentena=DIR_QUARENTENA):
+    """
+    Valida os CSVs ainda não vistos (ou alterados) e aplica o veredito.
+
+    Arquivos com o mesmo fingerprint de uma validação anterior são pulados sem
+    abrir o arquivo. Retorna a lista de avisos (arquivo, mensagem) sobre o que foi
+    reparado ou movido para a quarentena nesta chamada.
+    """
+    registro = _ler_registro(dir_proc)
+    avisos = []
+    nomes = set()
+    alterado = False
+
+    for f in arquivos:
+        f = Path(f)
+        nomes.add(f.name)
+        fp = fingerprint(f)
+        anterior = registro["arquivos"].get(f.name)
+        if anterior is not None and all(anterior.get(k) == v for k, v in fp.items()):
+            continue
+
+        alterado = True
+        veredito, motivo, assinatura = classificar_csv(f)
+
+        if veredito == VEREDITO_QUARENTENA:
+            avisos.append((f.name, _mover_para_quarentena(f, motivo, registro, dir_quarentena)))
+            continue
+
+        if veredito == VEREDITO_DESLOCADO:
+            try:
+                original = reparar_csv(f, dir_quarentena)
+            except Exception as e:
+                motivo = f"falha ao reparar deslocamento: {e}"
+                avisos.append((f.name, _mover_para_quarentena(f, motivo, registro, dir_quarentena)))
+                continue
+            motivo = f"reparado (deslocamento à esquerda), original em {original}"
+            avisos.append((f.name, motivo))
+            fp = fingerprint(f)
+            _, _, assinatura = classificar_csv(f)
+
+        registro["arquivos"][f.name] = {
+            **fp,
+            "assinatura": assinatura,
+            "veredito": veredito,
+            "motivo": motivo,
+        }
+
+    # Esquece arquivos que saíram de data/raw/
+    for nome in list(registro["arquivos"]):
+        if nome not in nomes:
+            del registro["arquivos"][nome]
+            alterado = True
+
+    if alterado:
+        _gravar_registro(dir_proc, registro)
+    return avisos
@@ -1,12 +1,15 @@
 import streamlit as st
 import pandas as pd
+import medicao
 import utils
 
 
-def renderizar(df, mes_ref, largura_grafico):
+@st.fragment
+@medicao.medir("tab_alertas.renderizar")
+def renderizar(df, cubo, indice, versao_dados, mes_ref, largura_grafico):
     st.subheader(f"⚠️ Alertas & Anomalias — {mes_ref}")
 
-    alertas = utils.detectar_anomalias(df, mes_ref)
+    alertas = utils.anomalias_do_mes(df, cubo, indice, versao_dados, mes_ref)
 
     if not alertas:
         st.info("Dados insuficientes para análise.")
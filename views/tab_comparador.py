@@ -1,10 +1,15 @@
 import streamlit as st
-import plotly.express as px
+import agregados
+import medicao
 import utils
 import pandas as pd
 
 
-def renderizar(df_view, meses, largura_grafico):
+@st.fragment
+@medicao.medir("tab_comparador.renderizar")
+def renderizar(df_view, cubo, versao_dados, meses, largura_grafico):
+    import plotly.express as px  # só quando a aba é desenhada (import pesado)
+
     st.subheader("⚖️ Duelo de Meses & Médias Históricas")
 
     # --- SELETORES ---
@@ -20,12 +25,13 @@ def renderizar(df_view, meses, largura_grafico):
 
     # --- GRÁFICO DE TENDÊNCIA ---
     st.markdown("#### 📈 Análise de Tendência (Últimos 6 Meses)")
-    df_hist = utils.buscar_historico_6m(df_view, mes_a)
+    df_hist = utils.buscar_historico_6m(df_view, mes_a, cubo=cubo)
 
     if not df_hist.empty:
-        df_hist["MesAno"] = df_hist["MesAno"].astype(str)
-        df_hist["Média Móvel (3m)"] = (
-            df_hist["Valor_View"].rolling(window=3, min_periods=1).mean()
+        # Média móvel pré-calculada sobre todo o histórico; o índice é a posição do mês
+        df_hist = df_hist.assign(
+            MesAno=df_hist["MesAno"].astype(str),
+            **{"Média Móvel (3m)": agregados.janelas(cubo)["media_movel"][df_hist.index]},
         )
         fig_hist = px.line(
             df_hist,
@@ -48,7 +54,7 @@ def renderizar(df_view, meses, largura_grafico):
 
     # --- KPIs DE CONTEXTO ---
     if mes_a:
-        atual, anterior, media_6m_val = utils.calcular_metricas_contexto(df_view, mes_a)
+        atual, anterior, media_6m_val = utils.calcular_metricas_contexto(df_view, mes_a, cubo=cubo)
 
         st.markdown(f"**Performance do Mês: {mes_a}**")
         k1, k2, k3 = st.columns(3)
@@ -75,15 +81,14 @@ def renderizar(df_view, meses, largura_grafico):
     # --- COMPARAÇÃO POR CATEGORIA ---
     if mes_a and mes_b:
         df_a_cat = (
-            df_view[df_view["MesAno"] == mes_a]
-            .groupby("Categoria")["Valor_View"]
-            .sum()
+            agregados.somar(cubo, "categoria", mes_a, ["Categoria"])
+            .rename("Valor_View")
             .reset_index()
         )
         df_a_cat["Origem"] = f"Mês {mes_a}"
 
         if mes_b == "Média (Últimos 6 meses)":
-            df_b_data = utils.gerar_df_media_historica(df_view, mes_a)
+            df_b_data = utils.gerar_df_media_historica(df_view, mes_a, cubo=cubo)
 
             if not df_b_data.empty:
                 df_b_plot = df_b_data.copy().rename(columns={"Valor_Media": "Valor_View"})
@@ -104,14 +109,13 @@ def renderizar(df_view, meses, largura_grafico):
                 return
         else:
             df_b_cat = (
-                df_view[df_view["MesAno"] == mes_b]
-                .groupby("Categoria")["Valor_View"]
-                .sum()
+                agregados.somar(cubo, "categoria", mes_b, ["Categoria"])
+                .rename("Valor_View")
                 .reset_index()
             )
             df_b_cat["Origem"] = f"Mês {mes_b}"
             df_comp_plot = pd.concat([df_a_cat, df_b_cat])
-            df_delta = utils.calcular_delta_meses(df_view, mes_a, mes_b)
+            df_delta = utils.delta_dos_meses(df_view, cubo, versao_dados, mes_a, mes_b)
 
         df_comp_plot["Origem"] = df_comp_plot["Origem"].astype(str)
 
@@ -1,10 +1,14 @@
 import streamlit as st
-import plotly.express as px
+import medicao
 import utils
 import pandas as pd
 
 
-def renderizar(df_mes, largura_grafico):
+@st.fragment
+@medicao.medir("tab_futuro.renderizar")
+def renderizar(df_mes, versao_dados, mes_ref, largura_grafico):
+    import plotly.express as px  # só quando a aba é desenhada (import pesado)
+
     st.subheader(
         f"🔮 Raio-X da Dívida ({df_mes['MesAno'].iloc[0] if not df_mes.empty else '--'})"
     )
@@ -45,8 +49,7 @@ def renderizar(df_mes, largura_grafico):
 
     st.subheader("Fluxo de Caixa Comprometido")
 
-    df_mes_safe = df_mes.copy()
-    df_tabela, df_grafico = utils.processar_dados_futuros(df_mes_safe)
+    df_tabela, df_grafico = utils.projecao_do_mes(df_mes, versao_dados, mes_ref)
 
     if df_tabela is not None:
         # --- DATA DE QUITAÇÃO ---
@@ -80,7 +83,7 @@ def renderizar(df_mes, largura_grafico):
         if not df_grafico.empty:
             # Limita a top 8 itens por valor total; agrupa o restante como "Outros"
             top_itens = (
-                df_grafico.groupby("Estabelecimento")["Valor"]
+                df_grafico.groupby("Estabelecimento", observed=True)["Valor"]
                 .sum()
                 .nlargest(8)
                 .index.tolist()
@@ -91,7 +94,7 @@ def renderizar(df_mes, largura_grafico):
             ] = "Outros"
             df_grafico_plot = (
                 df_grafico_plot
-                .groupby(["Mes_Sort", "Mês Referência", "Estabelecimento"])["Valor"]
+                .groupby(["Mes_Sort", "Mês Referência", "Estabelecimento"], observed=True)["Valor"]
                 .sum()
                 .reset_index()
                 .sort_values("Mes_Sort")
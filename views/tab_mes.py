@@ -1,19 +1,28 @@
 import streamlit as st
-import plotly.express as px
 import pandas as pd
+import agregados
+import particao
+import medicao
 import utils
 
 
-def renderizar(df_view, mes_ref, largura_grafico):
-    df_mes = df_view[df_view["MesAno"] == mes_ref].copy()
+@st.fragment
+@medicao.medir("tab_mes.renderizar")
+def renderizar(df_view, cubo, indice, mes_ref, largura_grafico):
+    import plotly.express as px  # só quando a aba é desenhada (import pesado)
 
-    if df_mes.empty:
+    if mes_ref not in cubo["mes"].index:
         st.warning(f"Sem dados para o mês {mes_ref}.")
         return
 
+    # Totais e gráficos saem do cubo; as transações do mês só para as tabelas
+    resumo = cubo["mes"].loc[mes_ref]
+    df_cat = agregados.recortar(cubo, "categoria", mes_ref).reset_index()
+    df_mes = particao.fatiar(df_view, indice, mes_ref)
+
     # --- ALERTA DE GASTO ACIMA DA MÉDIA ---
-    _, _, media_6m = utils.calcular_metricas_contexto(df_view, mes_ref)
-    total_mes = df_mes["Valor_View"].sum()
+    _, _, media_6m = utils.calcular_metricas_contexto(df_view, mes_ref, cubo=cubo)
+    total_mes = resumo["Valor"]
     if media_6m > 0 and total_mes > media_6m * 1.15:
         pct_acima = (total_mes / media_6m - 1) * 100
         st.warning(
@@ -24,10 +33,11 @@ def renderizar(df_view, mes_ref, largura_grafico):
     # --- KPIs ---
     c1, c2, c3, c4 = st.columns(4)
     c1.metric("Total Gasto (R$)", f"{total_mes:,.2f}")
-    c2.metric("Itens", len(df_mes))
-    c3.metric("Passivo Criado (R$)", f"{df_mes['Passivo_View'].sum():,.2f}")
+    c2.metric("Itens", int(resumo["Itens"]))
+    c3.metric("Passivo Criado (R$)", f"{resumo['Passivo']:,.2f}")
 
-    essencial = df_mes[df_mes["Tipo_Gasto"] == "Essencial"]["Valor_View"].sum()
+    por_tipo = agregados.recortar(cubo, "tipo_gasto", mes_ref).reset_index()
+    essencial = por_tipo.loc[por_tipo["Tipo_Gasto"] == "Essencial", "Valor"].sum()
     pct = (essencial / total_mes * 100) if total_mes > 0 else 0
     c4.metric("% Essencial", f"{pct:.1f}%")
 
@@ -37,10 +47,13 @@ def renderizar(df_view, mes_ref, largura_grafico):
     col_g1, col_g2 = st.columns(2)
     with col_g1:
         st.subheader("Raio-X: Categoria > Subcategoria")
+        # px.sunburst não agrega colunas categóricas; o recorte do mês vai como texto
         fig_sun = px.sunburst(
-            df_mes[df_mes["Valor_View"] > 0],
+            df_cat[df_cat["Valor_Positivo"] > 0].astype(
+                {"Categoria": str, "Subcategoria": str}
+            ),
             path=["Categoria", "Subcategoria"],
-            values="Valor_View",
+            values="Valor_Positivo",
             color="Categoria",
             color_discrete_sequence=px.colors.qualitative.Prism,
         )
@@ -49,8 +62,8 @@ def renderizar(df_view, mes_ref, largura_grafico):
     with col_g2:
         st.subheader("Essencial vs Estilo de Vida")
         fig_pie = px.pie(
-            df_mes,
-            values="Valor_View",
+            por_tipo,
+            values="Valor_Positivo",
             names="Tipo_Gasto",
             hole=0.4,
             color_discrete_map={"Essencial": "#2E86C1", "Estilo de Vida": "#E74C3C"},
@@ -66,9 +79,9 @@ def renderizar(df_view, mes_ref, largura_grafico):
     with col_b1:
         st.caption("Top 5 Lugares (Pareto)")
         top_places = (
-            df_mes.groupby("Estabelecimento")["Valor_View"]
-            .sum()
+            agregados.somar(cubo, "estabelecimento", mes_ref, ["Estabelecimento"])
             .nlargest(5)
+            .rename("Valor_View")
             .reset_index()
         )
         fig_pareto = px.bar(
@@ -108,7 +121,7 @@ def renderizar(df_view, mes_ref, largura_grafico):
     st.markdown("---")
     st.subheader("🔬 Microscópio de Gastos")
 
-    cats = sorted(df_mes["Categoria"].unique())
+    cats = sorted(df_cat["Categoria"].unique())
     filtro_cats = st.multiselect("Focar em Categorias específicas:", cats)
 
     if filtro_cats:
@@ -116,8 +129,10 @@ def renderizar(df_view, mes_ref, largura_grafico):
         st.markdown(f"**Detalhamento de: {', '.join(filtro_cats)}**")
 
         fig_sub = px.bar(
-            df_focado.groupby("Subcategoria")["Valor_View"]
+            df_cat[df_cat["Categoria"].isin(filtro_cats)]
+            .groupby("Subcategoria", observed=True)["Valor"]
             .sum()
+            .rename("Valor_View")
             .reset_index()
             .sort_values("Valor_View", ascending=False),
             x="Subcategoria",
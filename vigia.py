@@ -0,0 +1,116 @@
+"""
+vigia.py — Contador de versão dos dados movido a eventos do sistema de arquivos.
+
+Um observer do watchdog acompanha data/raw/ e incrementa um inteiro quando algum
+CSV é criado, alterado, renomeado ou removido. Cópias via scp disparam vários
+eventos de escrita seguidos; o contador só sobe depois de VIGIA_ESPERA_SEGUNDOS
+sem eventos novos, quando o arquivo já terminou de chegar. O rerun do dashboard
+só lê o inteiro, sem glob nem stat.
+
+Reparo e quarentena (validacao.py) regravam e movem arquivos de data/raw/ durante
+a própria carga do dashboard. validacao.py registra essas escritas; se tudo o
+que mudou na espera está exatamente no estado que o próprio processo deixou
+(validacao.escrita_propria), a versão não sobe e os dados não são recarregados.
+
+Sem watchdog (ou sem inotify disponível), versao() cai no modo antigo: um hash
+de (arquivo, mtime, tamanho) de todos os CSVs, calculado a cada chamada.
+"""
+
+import glob
+import os
+import threading
+
+import validacao
+from constants import VIGIA_ESPERA_SEGUNDOS
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # dashboard sem watchdog instalado: cai no polling
+    FileSystemEventHandler = object
+    Observer = None
+
+_TRAVA = threading.Lock()
+_estado = {"versao": 0, "observer": None, "timer": None, "polling": False, "pendentes": set()}
+
+
+def _eh_csv(caminho):
+    return str(caminho).lower().endswith(".csv")
+
+
+def _publicar():
+    with _TRAVA:
+        pendentes, _estado["pendentes"] = _estado["pendentes"], set()
+        _estado["timer"] = None
+        # Só escritas do próprio processo, e nada mexeu nos arquivos depois delas
+        if pendentes and all(validacao.escrita_propria(c) for c in pendentes):
+            return
+        _estado["versao"] += 1
+
+
+def _agendar():
+    """(Re)inicia a espera: cada evento novo adia a publicação da versão."""
+    with _TRAVA:
+        if _estado["timer"] is not None:
+            _estado["timer"].cancel()
+        timer = threading.Timer(VIGIA_ESPERA_SEGUNDOS, _publicar)
+        timer.daemon = True
+        _estado["timer"] = timer
+        timer.start()
+
+
+class _EventosCsv(FileSystemEventHandler):
+    def on_any_event(self, event):
+        if event.is_directory or event.event_type in ("opened", "closed_no_write"):
+            return
+        caminhos = [c for c in (event.src_path, getattr(event, "dest_path", "")) if _eh_csv(c)]
+        if caminhos:
+            with _TRAVA:
+                _estado["pendentes"].update(os.path.abspath(c) for c in caminhos)
+            _agendar()
+
+
+def _assinatura_csvs(dir_raw):
+    arquivos = glob.glob(os.path.join(dir_raw, "*.csv"))
+    return hash(tuple(sorted((f, os.path.getmtime(f), os.path.getsize(f)) for f in arquivos)))
+
+
+def iniciar(dir_raw):
+    """Sobe o observer de dir_raw uma única vez por processo. False se caiu no polling."""
+    with _TRAVA:
+        if _estado["observer"] is not None or _estado["polling"]:
+            return not _estado["polling"]
+        if Observer is None or not os.path.isdir(dir_raw):
+            _estado["polling"] = True
+            return False
+        observer = Observer()
+        observer.daemon = True
+        observer.schedule(_EventosCsv(), str(dir_raw), recursive=False)
+        try:
+            observer.start()
+        except OSError:  # limite de inotify esgotado, sistema de arquivos sem suporte
+            _estado["polling"] = True
+            return False
+        _estado["observer"] = observer
+        return True
+
+
+def versao(dir_raw):
+    """Inteiro que muda sempre que os CSVs de dir_raw mudam (sobe o observer na primeira chamada)."""
+    if _estado["observer"] is None and not _estado["polling"]:
+        iniciar(dir_raw)
+    if _estado["polling"]:
+        return _assinatura_csvs(dir_raw)
+    return _estado["versao"]
+
+
+def parar():
+    """Encerra o observer e a espera pendente (testes e scripts)."""
+    with _TRAVA:
+        observer, timer = _estado["observer"], _estado["timer"]
+        _estado.update(observer=None, timer=None, polling=False, pendentes=set())
+    if timer is not None:
+        timer.cancel()
+    if observer is not None:
+        observer.stop()
+        observer.join()